@@ -0,0 +1,96 @@
+"""
+Automatic plays of a TentsGame made on a background thread, so that the GUI keeps drawing (and reading the keys)
+while a slow play like ExclusionPlay or CasesPlay runs.
+
+The play is made on a copy of the game, so the game itself is never seen half played: when the play is over,
+the thread that owns the game applies the result with apply(), in a single step.
+A thread is enough (rather than a process): the GUI thread spends most of its time waiting for events, and
+Python switches between threads often enough for it to keep drawing at its frame rate.
+"""
+
+import threading
+
+from game import TentsGame
+
+
+class Cancelled(Exception):
+    """
+    Raised inside the play, by the progress callback, to stop it.
+    """
+
+
+class BackgroundPlay:
+    def __init__(self, game: TentsGame, action: str, on_update=None):
+        """
+        Starts playing action on a copy of game.
+        on_update (if passed) is called from the background thread every time the progress changes and when the
+        play is over, i.e. to wake up the GUI loop (g2d.request_redraw).
+        """
+        self.action = action
+        self.done, self.total = 0, 0  # Progress, in cells
+        self._start = game.get_board()
+        self._copy = game.copy()
+        self._copy.set_progress(self._progress)
+        self._result = None
+        self._error = None
+        self._on_update = on_update
+        self._cancel = threading.Event()
+        self._done = threading.Event()  # Set before the last update, so finished() is already True when it's handled
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._copy.play(1, 1, self.action)  # Automatic plays don't need a position
+            self._result = self._copy.get_board()
+        except Cancelled:
+            pass
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+            self._update()
+
+    def _progress(self, done: int, total: int):
+        if self._cancel.is_set():
+            raise Cancelled()
+        if (done, total) != (self.done, self.total):
+            self.done, self.total = done, total
+            self._update()
+
+    def _update(self):
+        if self._on_update is not None:
+            self._on_update()
+
+    def cancel(self):
+        """
+        Asks the play to stop. It stops at the next cell, then finished() becomes True and there's nothing to apply.
+        """
+        self._cancel.set()
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Waits for the play to be over (at most timeout seconds). Returns finished().
+        """
+        return self._done.wait(timeout)
+
+    def apply(self, game: TentsGame) -> bool:
+        """
+        Applies the result of the play to game, which must be the game passed to the constructor.
+        It must be called once finished() is True, from the thread that owns the game.
+        Returns False if there's nothing to apply: the play was cancelled, or the game was changed meanwhile
+        (the result would overwrite those changes).
+        The errors raised by the play are raised here, as they would be by a play made on the game itself.
+        """
+        if self._error is not None:
+            raise self._error
+        if self._result is None or game.get_board() != self._start:
+            return False
+        game.set_board(self._result)
+        return True
@@ -0,0 +1,149 @@
+"""
+Benchmarks of the automatic plays and of the checks of TentsGame.
+
+Usage:
+    python -m bench [--sizes 8 16 32 50] [--repeat N] [--output bench_output.txt] [--baseline old_output.txt]
+
+Every pass is run on every level in levels/ and on random boards of the passed sizes (always the same ones,
+as the seed is fixed). For each pass and board the benchmark measures:
+- median and p95 of the time taken (every run starts from a new game, so no cache is shared between runs)
+- peak memory allocated during a single run (with tracemalloc, in a separate run, as it slows everything down)
+- cells resolved: empty cells that the pass fixed (0 for the checks)
+The results are written as JSON lines, one for each pass and board. If a baseline (an older output) is passed,
+the medians are compared with it and the passes that got slower are printed.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from game import TentsGame
+from generator import TENT_DENSITY, random_board
+from solver import EMPTY
+from tents import level_files
+
+LEVELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")  # So it runs from any directory
+
+# Passes: name -> (function that runs it on a game, whether it runs on the solved board, max playable cells)
+# The heavy plays are skipped on big boards, where a single run takes minutes.
+PASSES = {
+    "AutoGrass": (lambda game: game.play(1, 1, "AutoGrass"), False, None),
+    "AutoTent": (lambda game: game.play(1, 1, "AutoTent"), False, None),
+    "LinePlay": (lambda game: game.play(1, 1, "LinePlay"), False, None),
+    "ExclusionPlay": (lambda game: game.play(1, 1, "ExclusionPlay"), False, 20 * 20),
+    "CasesPlay": (lambda game: game.play(1, 1, "CasesPlay"), False, 12 * 12),
+    "get_connected_board": (lambda game: game.get_connected_board(), True, None),
+    "wrong": (lambda game: game.wrong(), True, None),
+    "finished": (lambda game: game.finished(), True, None),
+}
+REGRESSION = 1.2  # A pass is reported as slower if its median grew more than this
+MIN_TIME = 0.001  # Passes faster than this (in both runs) are too noisy to be compared
+
+
+def boards(sizes: list[int]) -> list[tuple[str, bytearray, bytearray, int, int]]:
+    """
+    Returns the boards to run the passes on, as (name, board, solution, w, h) with the constraints included
+    in w and h.
+    """
+    result = []
+    for filename in level_files([LEVELS]):
+        game = TentsGame(filename)
+        board = game.get_disconnected_board()
+        result.append((os.path.basename(filename), board, game.solve(), game.cols(), game.rows()))
+    rng = random.Random(0)
+    for size in sizes:
+        # On big boards the density is lowered, so that the constraints stay single digits
+        board, solution = random_board(size, size, rng, min(TENT_DENSITY, 5 / size))
+        result.append((f"random-{size}x{size}", board, solution, size + 1, size + 1))
+    return result
+
+
+def bench_pass(name: str, board_name: str, board: bytearray, solution: bytearray, w: int, h: int,
+               repeat: int) -> dict | None:
+    """
+    Runs a single pass repeat times on the board (or on its solution, for the checks).
+    Returns its report, or None if the board is too big for it.
+    """
+    function, on_solution, max_cells = PASSES[name]
+    if max_cells is not None and (w - 1) * (h - 1) > max_cells:
+        return None
+    if on_solution:
+        board = solution
+
+    times = []
+    for _ in range(repeat):
+        game = TentsGame(board=board, w=w, h=h)
+        start = time.perf_counter()
+        function(game)
+        times.append(time.perf_counter() - start)
+    resolved = board.count(EMPTY) - game.get_disconnected_board().count(EMPTY)
+
+    game = TentsGame(board=board, w=w, h=h)
+    tracemalloc.start()
+    function(game)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        "pass": name,
+        "board": board_name,
+        "size": f"{w - 1}x{h - 1}",
+        "runs": repeat,
+        "median": round(statistics.median(times), 6),
+        "p95": round(times[min(len(times) - 1, int(len(times) * 0.95))], 6),
+        "peak_bytes": peak,
+        "resolved": resolved,
+    }
+
+
+def compare(reports: list[dict], baseline_file: str) -> int:
+    """
+    Prints the passes whose median is more than REGRESSION times the one in the baseline (and not below MIN_TIME).
+    Returns the exit code: 1 if at least one pass got slower.
+    """
+    with open(baseline_file) as file:
+        baseline = {(r["pass"], r["board"]): r for r in (json.loads(line) for line in file if line.strip())}
+    slower = 0
+    for report in reports:
+        old = baseline.get((report["pass"], report["board"]))
+        if old is None or max(old["median"], report["median"]) < MIN_TIME:
+            continue
+        if report["median"] > old["median"] * REGRESSION:
+            slower += 1
+            print(f"slower: {report['pass']} on {report['board']}: {old['median']:.6f}s -> {report['median']:.6f}s")
+    return 1 if slower else 0
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench", description="Benchmarks of the passes of TentsGame.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[8, 16, 32, 50], help="sizes of the random boards")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every pass on every board")
+    parser.add_argument("--passes", nargs="*", choices=PASSES, default=list(PASSES), help="passes to run")
+    parser.add_argument("--output", default="bench_output.txt", help="file where the results are written")
+    parser.add_argument("--baseline", help="older output to compare the results with")
+    args = parser.parse_args(argv)
+
+    reports = []
+    with open(args.output, "w") as output:
+        for board_name, board, solution, w, h in boards(args.sizes):
+            for name in args.passes:
+                report = bench_pass(name, board_name, board, solution, w, h, args.repeat)
+                if report is not None:
+                    reports.append(report)
+                    line = json.dumps(report)
+                    print(line, flush=True)
+                    output.write(line + "\n")
+
+    if args.baseline is not None:
+        return compare(reports, args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
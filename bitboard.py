@@ -0,0 +1,95 @@
+"""
+Bitboards: sets of cells of a Tents board stored as a single Python integer, where bit i is the cell at index i
+of the flat board (so the same indexing as TentsGame._board, constraints included).
+
+Whole-board neighbourhood operations become a few shifts and ORs over all the cells at once:
+moving a set of cells one column right is mask << 1, one row down is mask << w.
+No column masks are needed to keep the cells from wrapping around to the next row: a cell in the last
+column moved right ends up in column 0 of the next row, which is a constraint cell, and so does a cell in
+column 1 moved left. Constraint cells are dropped by ANDing with playable().
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=16)
+def playable(w: int, h: int) -> int:
+    """
+    Returns the mask of the playable cells (constraints excluded) of a w * h board.
+    """
+    row = (1 << w) - 2  # Every column but the first one
+    mask = 0
+    for y in range(1, h):
+        mask |= row << (y * w)
+    return mask
+
+
+def row_mask(y: int, w: int) -> int:
+    """
+    Returns the mask of the playable cells in row y.
+    """
+    return ((1 << w) - 2) << (y * w)
+
+
+@lru_cache(maxsize=1024)
+def col_mask(x: int, w: int, h: int) -> int:
+    """
+    Returns the mask of the playable cells in column x.
+    """
+    return playable(w, h) & sum(1 << (y * w + x) for y in range(1, h))
+
+
+def board_mask(board: bytearray, numbers: tuple[int, ...]) -> int:
+    """
+    Returns the mask of the cells of the board that contain one of the passed numbers.
+    """
+    bits = "".join("1" if number in numbers else "0" for number in reversed(board))
+    return int(bits, 2) if bits else 0
+
+
+def dilate4(mask: int, w: int, h: int) -> int:
+    """
+    Returns the playable cells adjacent (not diagonal) to at least one cell of mask.
+    The cells of mask themselves are included only if they're adjacent to another one.
+    """
+    return (mask << 1 | mask >> 1 | mask << w | mask >> w) & playable(w, h)
+
+
+def dilate8(mask: int, w: int, h: int) -> int:
+    """
+    Returns the playable cells near (diagonal is valid) at least one cell of mask.
+    The cells of mask themselves are included only if they're near another one, so i.e.
+    tents & dilate8(tents) == 0 means that no two tents touch.
+    """
+    row = mask | mask << 1 | mask >> 1
+    return (mask << 1 | mask >> 1 | row << w | row >> w) & playable(w, h)
+
+
+def cross(cells, w: int, h: int, radius: int = 0) -> int:
+    """
+    Returns the playable cells whose row or column is at most radius rows/columns away from one of the passed
+    cells (indexes), i.e. all the cells that the rules applied to those cells could look at.
+    """
+    rows, cols = set(), set()
+    for i in cells:
+        x, y = i % w, i // w
+        rows.update(range(max(y - radius, 1), min(y + radius + 1, h)))
+        cols.update(range(max(x - radius, 1), min(x + radius + 1, w)))
+    mask = 0
+    for y in rows:
+        mask |= row_mask(y, w)
+    for x in cols:
+        mask |= col_mask(x, w, h)
+    return mask
+
+
+def indexes(mask: int) -> list[int]:
+    """
+    Returns the indexes of the cells in mask, from the lowest one.
+    """
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
@@ -15,6 +15,7 @@ class BoardGameGui:
         self._game = game
         self._actions = actions
         self._annots = annots
+        self._drawn = None  # Texts currently drawn on the canvas, by position (None before the first draw)
         self.update_buttons()
 
     def tick(self):
@@ -33,16 +34,29 @@ class BoardGameGui:
             if k in released and y < game.rows():
                 game.play(x, y, v)
                 self.update_buttons((x, y))
+                g2d.request_redraw()  # So the next tick sees if the game is finished, even without other input
 
     def update_buttons(self, last_move=None):
+        # Only the cells whose text has changed since the last frame are drawn again
+        # (each cell is drawn over its own area, so the rest of the canvas can be left as it is)
         cols, rows = self._game.cols(), self._game.rows()
-        g2d.clear_canvas(BLACK)
+        if self._drawn is None:
+            g2d.clear_canvas(BLACK)
+            self._drawn = {}
         for y in range(rows):
             for x in range(cols):
                 text = self._game.read(x, y)
-                self.write(text, (x, y))
-        status = self._game.status()
-        self.write(status, (0, rows), cols)
+                if self._drawn.get((x, y)) != text:
+                    self.write(text, (x, y))
+                    self._drawn[(x, y)] = text
+        status = self.status()
+        if self._drawn.get("status") != status:
+            self.write(status, (0, rows), cols)
+            self._drawn["status"] = status
+
+    def status(self) -> str:
+        # Text of the status row (subclasses can show something else, i.e. while the game is busy)
+        return self._game.status()
 
     def write(self, text, pos, cols=1):
         x, y = pos
@@ -0,0 +1,123 @@
+"""
+Worker processes that evaluate the cases of CasesPlay (see TentsGame._cases_play()) in parallel.
+
+The pool is started the first time it's needed and then kept, together with the games of its workers (and their
+transposition tables), until it's closed: a game and its copies share the same pool, as the level is the same.
+The board isn't sent with every cell: it's written once for every board in a shared memory buffer, under a new
+version number, and the workers only get the version and the index of the cell to evaluate.
+
+The buffer starts with the version of the board in it (0 while it's being written). A worker reads the version
+before and after copying the board: if either is not the version of its cell, the board of that cell has already
+been replaced (the cell isn't needed anymore), so it returns None without evaluating it.
+"""
+
+import weakref
+from collections import deque
+
+HEADER = 8  # Bytes of the version at the start of the shared buffer
+
+
+class CasesPool:
+    def __init__(self):
+        self._executor = None
+        self._memory = None
+        self._level = None  # (workers, w, h, constraints) the pool was started for
+        self._version = 0
+        self._finalizer = None
+
+    def results(self, workers: int, board: bytearray, w: int, h: int, cells: list[int]):
+        """
+        Generates the result of TentsGame._case_result() for every cell, in order, all on the passed board
+        (w * h cells, constraints included). Up to workers cells are evaluated at the same time.
+        The cells not needed anymore are cancelled when the generator is closed (the ones already running finish,
+        but their results are ignored).
+        """
+        self._start(workers, board, w, h)
+        version = self._publish(board)
+        queue = iter(cells)
+        ahead = deque()  # Futures of the cells sent to the workers, in order
+        try:
+            while True:
+                for i in queue:
+                    ahead.append(self._executor.submit(_evaluate, version, i))
+                    if len(ahead) == workers:
+                        break
+                if not ahead:
+                    return
+                yield ahead.popleft().result()
+        finally:
+            for future in ahead:
+                future.cancel()
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared buffer. The pool is started again if it's needed.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+        self._executor, self._memory, self._level, self._finalizer = None, None, None, None
+
+    def _start(self, workers: int, board: bytearray, w: int, h: int):
+        """
+        Starts the pool, unless it's already running with the same number of workers for the same level.
+        """
+        level = (workers, w, h, bytes(board[:w]), bytes(board[::w]))
+        if level == self._level:
+            return
+        self.close()
+        # Only imported here, as they're slow to import and most games never use them
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        self._memory = shared_memory.SharedMemory(create=True, size=HEADER + len(board))
+        self._executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                             initargs=(self._memory.name, bytes(board), w, h))
+        self._level = level
+        # Closed when the pool is garbage collected or at exit, if close() is never called
+        self._finalizer = weakref.finalize(self, _shutdown, self._executor, self._memory)
+
+    def _publish(self, board: bytearray) -> int:
+        """
+        Writes the board in the shared buffer and returns its new version.
+        """
+        self._version += 1
+        buffer = self._memory.buf
+        buffer[:HEADER] = bytes(HEADER)
+        buffer[HEADER:HEADER + len(board)] = board
+        buffer[:HEADER] = self._version.to_bytes(HEADER, "little")
+        return self._version
+
+
+def _shutdown(executor, memory):
+    executor.shutdown(wait=False, cancel_futures=True)
+    memory.close()
+    memory.unlink()
+
+
+# -- WORKER PROCESSES --
+_memory = None  # Shared buffer of the pool
+_game = None    # Game of this worker, kept for the whole life of the pool
+
+
+def _init_worker(name: str, board: bytes, w: int, h: int):
+    global _memory, _game
+    from multiprocessing import shared_memory
+    from game import TentsGame
+
+    _memory = shared_memory.SharedMemory(name=name)
+    _game = TentsGame(board=bytearray(board), w=w, h=h)
+
+
+def _evaluate(version: int, i: int) -> dict[int, int] | None:
+    """
+    Evaluates the cell at index i on the board with the passed version. Returns None if that board has already
+    been replaced.
+    """
+    buffer = _memory.buf
+    if int.from_bytes(buffer[:HEADER], "little") != version:
+        return None
+    board = bytearray(buffer[HEADER:HEADER + len(_game.get_board())])
+    if int.from_bytes(buffer[:HEADER], "little") != version:
+        return None
+    _game.set_board(board)
+    return _game._case_result(i)
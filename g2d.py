@@ -7,6 +7,7 @@
 from tkinter import Tk, messagebox, simpledialog
 from urllib.request import urlopen
 import io, math, subprocess, sys
+from functools import lru_cache
 try:
     import pygame as pg
 except:
@@ -17,10 +18,7 @@ except:
 Point = tuple[float, float]
 Color = tuple[float, float, float]
 
-_tkmain = Tk()
-_tkmain.withdraw()  # hide the main window
-_ws, _hs = _tkmain.winfo_screenwidth(), _tkmain.winfo_screenheight()
-_tkmain.geometry(f"+{_ws // 2}+{_hs // 2}")
+_tkmain = None  # created on first use, see _tk()
 
 _canvas, _display, _tick = None, None, None
 _size, _stroke = (640, 480), 0
@@ -29,6 +27,16 @@ _mouse_pos, _mouse_down = (0, 0), 0
 _curr_keys, _prev_keys = set(), set()
 _loaded = {}
 
+def _tk() -> Tk:
+    """Create the hidden Tk root used by dialogs, the first time it's needed"""
+    global _tkmain
+    if _tkmain is None:
+        _tkmain = Tk()
+        _tkmain.withdraw()  # hide the main window
+        ws, hs = _tkmain.winfo_screenwidth(), _tkmain.winfo_screenheight()
+        _tkmain.geometry(f"+{ws // 2}+{hs // 2}")
+    return _tkmain
+
 def _tup(t: tuple, vmin=-math.inf, vmax=math.inf) -> tuple:
     return tuple(min(max(round(v), vmin), vmax) for v in t)
 
@@ -93,13 +101,26 @@ def draw_rect(pos: Point, size: Point) -> None:
     pg.draw.rect(surf, _color, rect, width=_stroke)
     blit_drawing_surface()
 
-def draw_text(text: str, center: Point, size: int) -> None:
+@lru_cache(maxsize=1)
+def _font_name() -> str:
+    """Font used for texts, looked up among the system fonts only once"""
     fname, fonts = "segoeuisymbol", pg.font.get_fonts()
-    fname = fname if fname in fonts else "freesansbold"
-    font = pg.font.SysFont(fname, int(size))
-    surface = font.render(text, True, _color)
-    if len(_color) > 3 and _color[3] != 255:
-        surface.set_alpha(_color[3])
+    return fname if fname in fonts else "freesansbold"
+
+@lru_cache(maxsize=32)
+def _font(fname: str, size: int) -> pg.font.Font:
+    return pg.font.SysFont(fname, size)
+
+@lru_cache(maxsize=1024)
+def _text_surface(text: str, size: int, color: tuple) -> pg.Surface:
+    """Rendered text, cached: the same texts are drawn again and again"""
+    surface = _font(_font_name(), size).render(text, True, color)
+    if len(color) > 3 and color[3] != 255:
+        surface.set_alpha(color[3])
+    return surface
+
+def draw_text(text: str, center: Point, size: int) -> None:
+    surface = _text_surface(text, int(size), _color)
     (x, y), (w, h) = _tup(center), surface.get_size()
     _canvas.blit(surface, (x - w//2, y - h//2))
 
@@ -144,17 +165,17 @@ def pause_audio(src: str) -> None:
 def alert(message: str) -> None:
     if _canvas:
         update_canvas()
-    messagebox.showinfo("", message)
+    messagebox.showinfo("", message, parent=_tk())
 
 def confirm(message: str) -> bool:
     if _canvas:
         update_canvas()
-    return messagebox.askokcancel("", message)
+    return messagebox.askokcancel("", message, parent=_tk())
 
 def prompt(message: str) -> str:
     if _canvas:
         update_canvas()
-    return simpledialog.askstring("", message) or ""
+    return simpledialog.askstring("", message, parent=_tk()) or ""
 
 def mouse_pos() -> Point:
     return _mouse_pos
@@ -191,14 +212,26 @@ def key_pressed(key: str) -> bool:
 def key_released(key: str) -> bool:
     return key in _prev_keys and key not in _curr_keys
 
-def main_loop(tick=None, fps: int=30) -> None:
+def request_redraw() -> None:
+    """Wake up a main loop in "on_event" mode, so that tick is called even without input"""
+    if pg.display.get_init():
+        pg.event.post(pg.event.Event(pg.USEREVENT))
+
+def main_loop(tick=None, fps: int=30, mode: str="fixed") -> None:
+    """Call tick and update the canvas until the window is closed.
+    mode "fixed": fps times per second.
+    mode "on_event": only when some input arrives or request_redraw() is called,
+    otherwise the loop sleeps (fps is still the maximum rate)."""
     global _mouse_pos, _tick
     _tick = tick
     clock = pg.time.Clock()
     update_canvas()
     running = True
     while running:
-        for e in pg.event.get():
+        events = pg.event.get()
+        if mode == "on_event" and not events:
+            events = [pg.event.wait()]
+        for e in events:
             if e.type == pg.QUIT:
                 running = False
                 break
@@ -1,12 +1,43 @@
-from copy import deepcopy
-
-import g2d
-from boardgamegui import BoardGameGui
+import time
+from functools import lru_cache
+from bitboard import board_mask, cross, dilate4, dilate8, indexes
 from boardgame import BoardGame
+from casespool import CasesPool
+from collections import deque
+from heapq import heapify, heappop, heappush
+from lines import solve_line
+from matching import hopcroft_karp
+from stats import GameStats
+from transposition import TranspositionTable, SLOTS, zobrist_hash, zobrist_keys
+from solver import Solver, EMPTY, TREE, TENT, GRASS, CONNECTED_TREE, CONNECTED_TENT, NUMBER, NULL, DISCONNECT
 
 W, H = 40, 40
 
-def print_board(board: list[int], w: int, h: int) -> None:
+# Propagation rules (see TentsGame._propagate()): name -> what they look at (a cell or a line)
+RULES = {
+    "NearTent": "cell",    # Grass near a tent
+    "FullLine": "line",    # Grass in a line that has all its tents
+    "NeedsAll": "line",    # Tents in a line that needs all its empty cells
+    "LonelyTree": "cell",  # Tent in the only empty cell adjacent to a tree without a tent
+    "NoTree": "cell",      # Grass in a cell without adjacent trees
+}
+RULE_METHODS = {
+    "NearTent": "_near_tent_rule",
+    "FullLine": "_full_line_rule",
+    "NeedsAll": "_needs_all_rule",
+    "LonelyTree": "_lonely_tree_rule",
+    "NoTree": "_no_tree_rule",
+}
+GRASS_RULES = ("NearTent", "FullLine", "NoTree")
+# The rules applied to a cell look at its own row and column, and at the cells up to two steps away
+# (i.e. the other cells adjacent to its adjacent trees): the probes of _exclusion_play() can only change when
+# a cell changes in these rows and columns around the cells they set.
+PROBE_RADIUS = 2
+# Kind of every cell for the line masks (see TentsGame._write()): TENT, EMPTY or GRASS (can't be a tent)
+LINE_KINDS = bytes(TENT if number in (TENT, CONNECTED_TENT) else EMPTY if number == EMPTY else GRASS
+                   for number in range(256))
+
+def print_board(board: bytearray, w: int, h: int) -> None:
     """
     (Function made with debug purposes)
     Prints the passed matrix on the console.
@@ -18,42 +49,136 @@ def print_board(board: list[int], w: int, h: int) -> None:
             print(f"{board[i]:^5}", end= term)
 
 
-def get_adjacencies(board: list[int], width: int, height: int, x: int, y: int) -> list[int, tuple[int, int]]:
+@lru_cache(maxsize=16)
+def neighbour_tables(width: int, height: int) -> tuple[tuple[tuple[int, ...], ...], tuple[tuple[int, ...], ...]]:
+    """
+    Returns two tables with the neighbours of every cell of a board (indexed as the flat board, constraints included):
+    - the indexes of the adjacent cells (not diagonal), in the order left, right, up, down
+    - the indexes of the near cells (diagonal is valid)
+    Only the playable cells are listed (1 <= x < width, 1 <= y < height): constraint cells are excluded.
+    The tables are computed once for every board size, and shared by all the games of that size.
+    """
+    adjacent, near = [], []
+    for i in range(width * height):
+        x, y = i % width, i // width
+        adjacent.append(tuple(ay * width + ax for ax, ay in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1))
+                              if 1 <= ax < width and 1 <= ay < height))
+        near.append(tuple((y + dy) * width + x + dx for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                          if (dx, dy) != (0, 0) and 1 <= x + dx < width and 1 <= y + dy < height))
+    return tuple(adjacent), tuple(near)
+
+
+def get_adjacencies(board: bytearray, width: int, height: int, x: int, y: int) -> list[int, tuple[int, int]]:
     """
     Given a board, its width and height and a specific cell...
     it returns the list of all adjacent cells (not diagonal).
     Each returned element in the list is a pair: the state and the position of the cell. (While the method inside TentsGame only returns the values).
     """
-    adj = []
-    for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-        ax, ay = x + dx, y + dy
-        if 0 < ax < width and 0 < ay < height:
-            i = ay * width + ax
-            adj.append((board[i], (ax, ay)))
-    return adj
+    return [(board[i], (i % width, i // width)) for i in neighbour_tables(width, height)[0][y * width + x]]
 
 class TentsGame(BoardGame):
-    def __init__(self, file: str = None):
+    def __init__(self, file: str = None, board: bytearray = None, w: int = 0, h: int = 0):
+        """
+        The level is read from file, or copied from board (w * h cells, constraints included, in the same format
+        as the game board). Building a game from a board is cheap: no files and no GUI modules are involved.
+        """
 
         self._w, self._h = 0, 0
 
         """
         The board will be represented by a matrix of integers.
-        The matrix will be a flat list.
-        Each number in a single cells has a meaning (which can also be seen in the static attributes):
-        - 0: Empty cell
-        - 1: Tree
-        - 2: Tent
-        - 3: Grass
+        The matrix will be a flat bytearray (one byte per cell).
+        Each number in a single cells has a meaning (which can also be seen in the static attributes and in
+        the constants imported from solver.py):
+        - 0: Empty cell (EMPTY)
+        - 1: Tree (TREE)
+        - 2: Tent (TENT)
+        - 3: Grass (GRASS)
         - 90-99: The numbers from 90 to 99 will represent their unit digit number (i.e. 97 -> 7). These are used for row/col constraints.
-        - 11: Tree marked as connected to a tent
-        - 12: Tent marked as connected to a tree
-        - -1: Null (Used for the unused first cell, it will be drawn as a black square)
+        - 11: Tree marked as connected to a tent (CONNECTED_TREE)
+        - 12: Tent marked as connected to a tree (CONNECTED_TENT)
+        - 255: Null (NULL, used for the unused first cell, it will be drawn as a black square)
+        """
+        self._board = bytearray()
+
+        """
+        The constraints are also kept as plain numbers (not NUMBER + digit) in two separate lists.
+        Index 0 is unused in both, so that they can be indexed with the row/column number.
+        """
+        self._row_constraints = []
+        self._col_constraints = []
+
+        """
+        Undo trail: while at least one snapshot is active, every change made to the board is recorded
+        as a pair (index, previous number), so that it can be undone by restore().
+        """
+        self._trail = []
+        self._snapshots = 0
+
+        """
+        Connection cache, used by _connected_board() while propagating:
+        - the last connected board computed (None if it must be computed from scratch)
+        - the cells that have been filled (empty -> tent/grass) since then
+        While cells are only filled, the connections already found stay valid, so only the surroundings of the
+        filled cells need to be checked again. Any other change clears the cache.
+        The connections depend on the order the cells are checked in (connecting a pair can make another one
+        unambiguous), so the cached connections can differ from the ones found from scratch on the same board:
+        they're all unambiguous anyway. get_connected_board() always starts from scratch, and its result becomes
+        the new cache.
+        A copy of both is kept for every active snapshot, so that restore() brings back the cache too.
+        """
+        self._connected = None
+        self._filled = []
+        self._connection_stack = []
+
+        """
+        Optional statistics (see enable_stats()): None when disabled.
+        """
+        self.stats = None
+        self._wrapped = []
+
+        """
+        Optional progress callback of the slow automatic plays (see set_progress()): None when not set.
+        """
+        self._progress = None
+        self._outer_progress = 0, 0
+
+        """
+        Zobrist hash of the board (see transposition.py), kept updated by _write, and the results of the cases
+        already tried by the automatic plays (see _try_case()), keyed by that hash.
+        """
+        self._zobrist = None
+        self._hash = 0
+        self.deductions = TranspositionTable()
+
+        """
+        Bitboards (see bitboard.py): for every number, the mask of the cells that contain it.
+        They're kept updated by _write, so the plays can look at the neighbourhoods of whole sets of cells at once.
+        """
+        self._bits = [0] * 256
+
+        """
+        Neighbour tables of the board size (see neighbour_tables()), shared with the other games of the same size.
+        """
+        self._adjacent, self._near = (), ()
+
+        """
+        Cells changed while the rules are being propagated (see _propagate()): None when not propagating.
         """
-        self._board = []
+        self._changed = None
+
+        """
+        Processes used by CasesPlay (see _cases_play()): with 1, the cases are evaluated in this process.
+        More are only worth it on big boards and with as many cores. The processes are started by the first
+        CasesPlay and kept (shared with the copies of the game) until close() is called.
+        """
+        self.workers = 1
+        self._cases_pool = CasesPool()
 
         if file is not None:
             self._read_file(file)
+        elif board is not None:
+            self._load_level(bytearray(board), w, h)
 
         if self._w == 0 or self._h == 0 or len(self._board) == 0:
             raise ValueError("Passed matrix is empty")
@@ -65,7 +190,10 @@ class TentsGame(BoardGame):
         "g": "AutoGrass", "t": "AutoTent",
         "c": "CheckConnected",
         "a": "ExclusionPlay",
-        "p": "CasesPlay"
+        "p": "CasesPlay",
+        "l": "LinePlay",
+        "s": "Solve",
+        "m": "ShowMatching"
     }
     ANNOTS = {
         " ": ((128, 128, 128), 0),
@@ -90,7 +218,7 @@ class TentsGame(BoardGame):
 
     # The following two must be considered "two-way dictionaries", so they must be always edited together.
     NUMBER_STATES = {
-        -1: "Null",
+        NULL: "Null",
         0: "Empty",
         1: "Tree", 11: "ConnectedTree",
         2: "Tent", 12: "ConnectedTent",
@@ -102,7 +230,7 @@ class TentsGame(BoardGame):
         98: "Number8",  99: "Number9"
     }
     STATE_NUMBERS = {
-        "Null": -1,
+        "Null": NULL,
         "Empty": 0,
         "Tree": 1, "ConnectedTree": 11,
         "Tent": 2, "ConnectedTent": 12,
@@ -121,14 +249,14 @@ class TentsGame(BoardGame):
             match action:
                 case "CycleLeft":
                     match self._board[i]:
-                        case 0: self._board[i] = 2
-                        case 2 | 12: self._board[i] = 3
-                        case 3 | 13: self._board[i] = 0
+                        case 0: self._set(i, 2)
+                        case 2 | 12: self._set(i, 3)
+                        case 3 | 13: self._set(i, 0)
                 case "CycleRight":
                     match self._board[i]:
-                        case 0: self._board[i] = 3
-                        case 2 | 12: self._board[i] = 0
-                        case 3 | 13: self._board[i] = 2
+                        case 0: self._set(i, 3)
+                        case 2 | 12: self._set(i, 0)
+                        case 3 | 13: self._set(i, 2)
                 case "AutoGrass":
                     self._auto_grass()
                 case "AutoTent":
@@ -139,6 +267,19 @@ class TentsGame(BoardGame):
                     self._exclusion_play()
                 case "CasesPlay":
                     self._cases_play()
+                case "LinePlay":
+                    self._line_play()
+                case "Solve":
+                    solution = self.solve()
+                    if solution is not None:
+                        self._load_board(solution)
+                case "ShowMatching":
+                    # Marks every pair as connected, if every tree has its own tent
+                    matching = self.get_matching()
+                    if matching is not None:
+                        for tree_i, tent_i in matching.items():
+                            self._set(tree_i, CONNECTED_TREE)
+                            self._set(tent_i, CONNECTED_TENT)
 
     def finished(self) -> bool:
         return self._check_equity() and \
@@ -146,7 +287,8 @@ class TentsGame(BoardGame):
             self._check_all_tents_adj_trees() and \
             self._check_all_tents_vicinity() and \
             self._check_row_constraints() and \
-            self._check_col_constraints()
+            self._check_col_constraints() and \
+            self._check_matching()  # Last, as it's the only one that is not O(1)
 
     def cols(self) -> int:
         return self._w
@@ -172,151 +314,514 @@ class TentsGame(BoardGame):
             return "Row constraints not satisfied"
         elif not self._check_col_constraints():
             return "Column constraints not satisfied"
+        elif not self._check_matching():
+            return "Trees and tents can't be paired"
         else:
             return "Huh? Even I'm confused!" # Not possible case
 
     # -- PLAY METHODS --
     def _auto_grass(self):
-        # Clear near tent
-        self._board = self.get_connected_board()
-        for y in range(self._h):
-            for x in range(self._w):
-                if self._cell_state(x, y) == "Empty" and {self._get_state_number("Tent"), self._get_state_number("ConnectedTent")} & set(self.get_near_cells(x, y)):
-                    i = y * self._w + x
-                    self._board[i] = self._get_state_number("Grass")
-
-        # Check for row constraints
-        self._board = self.get_connected_board()
-        for y in range(1, self._h):  # First row and column are skipped, as they contain the actual constraints.
-            if self._check_row_constraint(y):
-                for x in range(1, self._w):
-                    if self._cell_state(x, y) == "Empty":
-                        i = y * self._w + x
-                        self._board[i] = self._get_state_number("Grass")
-
-        # Check for column constraints
-        self._board = self.get_connected_board()
-        for x in range(1, self._w):
-            if self._check_col_constraint(x):
-                for y in range(1, self._h):
-                    if self._cell_state(x, y) == "Empty":
-                        i = y * self._w + x
-                        self._board[i] = self._get_state_number("Grass")
-
-        # Check if not near any tree
-        self._board = self.get_connected_board()
-        for x in range(1, self._w):
-            for y in range(1, self._h):
-                if self._cell_state(x, y) == "Empty":
-                    adjs = self.get_adjacent_cells(x, y)
-                    if self._get_state_number("Tree") not in adjs:
-                        i = x + y * self._w
-                        self._board[i] = self._get_state_number("Grass")
+        """
+        Sets as grass the empty cells that can't be tents, until there are no more (see _propagate()):
+        - the cells near a tent
+        - the cells of a row/column that already has all its tents
+        - the cells without adjacent trees (connected trees don't count, they already have their tent)
+        """
+        self._propagate(GRASS_RULES)
 
     def _auto_tent(self):
-        # Check for row constraints
-        self._board = self.get_connected_board()
-        for y in range(1, self._h):
-            tent_number, *cells = self._get_row(y)
-            tent_number -= 90
-            if tent_number == cells.count(self._get_state_number("Tent")) + cells.count(self._get_state_number("Empty")) + cells.count(self._get_state_number("ConnectedTent")):
-                for x in range(1, self._w):
-                    if self._cell_state(x, y) == "Empty":
-                        i = y * self._w + x
-                        self._board[i] = self._get_state_number("Tent")
-
-        # Check for column constraints
-        self._board = self.get_connected_board()
-        for x in range(1, self._w):
-            tent_number, *cells = self._get_column(x)
-            tent_number -= 90
-            if tent_number == cells.count(self._get_state_number("Tent")) + cells.count(self._get_state_number("Empty")) + cells.count(self._get_state_number("ConnectedTent")):
-                for y in range(1, self._h):
-                    if self._cell_state(x, y) == "Empty":
-                        i = y * self._w + x
-                        self._board[i] = self._get_state_number("Tent")
-
-
-        # Check if there's a tree with exactly one empty adjacent cell
-        self._board = self.get_connected_board()
-        for x in range(1, self._w):
-            for y in range(1, self._h):
-                if self._cell_state(x, y) == "Tree":
-                    adjs = get_adjacencies(self._board, self._w, self._h, x, y)
-                    empty_adjs = [pos for state, pos in adjs if state == self._get_state_number("Empty")]
-                    tent_adjs = [pos for state, pos in adjs if state == self._get_state_number("Tent")]
-                    # TODO: Capire se ci vuole oppure no
-                    # Pare di no
-                    # tent_adjs += [pos for state, pos in adjs if state == self._get_state_number("ConnectedTent")]
-                    if len(tent_adjs) == 0 and len(empty_adjs) == 1:
-                        empty_cell = empty_adjs[0]
-                        cell_x, cell_y = empty_cell
-                        cell_i = cell_y * self._w + cell_x
-                        self._board[cell_i] = self._get_state_number("Tent")
-
-                        self._auto_grass() # When a tent is placed, grass will automatically be placed around it
-                        # This prevents multiple tents being placed next to each other "at the same time".
-
-    def _exclusion_play(self):
-        """
-        Makes a play guessing on every empty cells.
-        It creates a copy of the board with only one of the empty cells marked as a tent or grass.
-        If that cell being a tree brings the board to a wrong state, it will be set as grass.
-        Similarly, if a cell marked as a grass brings the board to a wrong state, it will be set as a tent-
-        """
-        if self.wrong(): return
-
-        for y in range(1, self._h):  # They will have the same height width
-            for x in range(1, self._w):
-                if self._cell_state(x, y) == "Empty":
-                    new_game = deepcopy(self)
-                    new_game.set_cell(x, y, "Tent")
-                    new_game.play(1, 1, new_game.get_command_keys("AutoGrass")[0])
-                    new_game.play(1, 1, new_game.get_command_keys("AutoTent")[0])
-                    new_game.play(1, 1, new_game.get_command_keys("AutoGrass")[0])
-                    if new_game.wrong():
-                        self.set_cell(x, y, "Grass")
-                    else:
-                        new_game = deepcopy(self)
-                        new_game.set_cell(x, y, "Grass")
-                        new_game.play(1, 1, new_game.get_command_keys("AutoGrass")[0])
-                        new_game.play(1, 1, new_game.get_command_keys("AutoTent")[0])
-                        new_game.play(1, 1, new_game.get_command_keys("AutoGrass")[0])
-                        if new_game.wrong():
-                            self.set_cell(x, y,"Tent")
+        """
+        Places the tents that are sure, together with the grass around them, until there's nothing more to do
+        (see _propagate()). Tents are placed:
+        - in the empty cells of a row/column that needs all of them
+        - in the only empty cell adjacent to a tree that doesn't have a tent yet
+        """
+        self._propagate(tuple(RULES))
+
+    def _line_play(self):
+        """
+        Solves every row and then every column on its own, like in a nonogram.
+        All the placements of the tents allowed by the constraint and by the cells already fixed are considered
+        (tents in a line can't touch): the empty cells with the same state in all of them are set (see lines.py).
+        """
+        board = self._board
+        for line, target in self._lines():
+            tents, blocked = self._line_masks(line)
+            forced = solve_line(len(line), target, tents, blocked)
+            if forced is None:
+                continue  # The line can't be completed, the board is wrong
+            tent_cells, grass_cells = forced
+            for k, i in enumerate(line):
+                if board[i] == EMPTY:
+                    if tent_cells >> k & 1:
+                        self._set(i, TENT)
+                    elif grass_cells >> k & 1:
+                        self._set(i, GRASS)
+
+    def _exclusion_play(self, propagated: bool = False, max_probes: int = None, max_time: float = None) -> dict:
+        """
+        Failed-literal probing: every empty cell is tried as a tent and as grass, propagating the consequences
+        (see _try_case()):
+        - if one of the two brings the board to a wrong state, the cell is set as the other one
+        - the cells that get the same state in both cases (implied by the cell, whatever it is) are set too
+        Whenever cells are set, their consequences are propagated, and the cells already probed are probed again
+        if their cases could have changed: the set cells are in the rows/columns that the rules looked at while
+        propagating them (see PROBE_RADIUS). This goes on until no probe can find anything more, so what is found
+        doesn't depend on the order of the probes (the cells set may, but not the board they lead to with the rules).
+        Only the cells found this way are set on the board, not all their consequences: the board is propagated
+        at the beginning inside a snapshot (if propagated is True, that's already been done), and undone at the end.
+        The probing stops early after max_probes probes or max_time seconds (the cells found so far are set).
+        Returns a report: probes made, cells found and whether the probing was complete.
+        """
+        report = {"probes": 0, "found": 0, "complete": True}
+        if self.wrong():
+            return report
+        start_time = time.perf_counter()
+        w, h = self._w, self._h
+
+        mark = self.snapshot()
+        if not propagated:
+            self._propagate(tuple(RULES))
+        found = {}
+        queue = deque(i for i in range(w * h) if self._board[i] == EMPTY)
+        queued = set(queue)
+        footprints = {}  # Cell probed without finding anything -> cells whose change could change its cases
+        probed = 0
+        while queue:
+            if (max_probes is not None and report["probes"] >= max_probes) or \
+                    (max_time is not None and time.perf_counter() - start_time >= max_time):
+                report["complete"] = False
+                break
+            if propagated:
+                self._report_progress()
+            else:
+                self._report_progress(probed, probed + len(queue))
+            i = queue.popleft()
+            queued.discard(i)
+            if self._board[i] != EMPTY:
+                continue
+            probed += 1
+
+            x, y = i % w, i // w
+            report["probes"] += 1
+            wrong, tent_case = self._try_case(x, y, "Tent")
+            if wrong:
+                fixed = {i: GRASS}
+            else:
+                report["probes"] += 1
+                wrong, grass_case = self._try_case(x, y, "Grass")
+                if wrong:
+                    fixed = {i: TENT}
+                else:
+                    fixed = {j: number for j, number in tent_case.items()
+                             if grass_case.get(j) == number and DISCONNECT[self._board[j]] != number}
+            if not fixed:
+                footprints[i] = cross(tent_case.keys() | grass_case.keys(), w, h, PROBE_RADIUS)
+                continue
+
+            # The next probes start from the board with these cells set (and their consequences)
+            before = len(self._trail)
+            for j, number in fixed.items():
+                self._set(j, number)
+            found.update(fixed)
+            self._propagate(tuple(RULES), list(fixed))
+            if self.wrong():
+                break  # The board has no solution
+            changed = 0
+            for j, _ in self._trail[before:]:
+                changed |= 1 << j
+            for j in [j for j, footprint in footprints.items() if footprint & changed]:
+                del footprints[j]
+                if j not in queued:
+                    queue.append(j)
+                    queued.add(j)
+        self.restore(mark)
+
+        for i, number in found.items():
+            self._set(i, number)
+        report["found"] = len(found)
+        return report
+
+    def probe(self, max_probes: int = None, max_time: float = None) -> dict:
+        """
+        Makes an exclusion play that stops after max_probes probes or max_time seconds, i.e. to be used while
+        the player is waiting. Returns its report (see _exclusion_play()).
+        """
+        return self._exclusion_play(max_probes=max_probes, max_time=max_time)
 
     def _cases_play(self):
         """
         Makes an automatic play trying to see if there are sure adjacencies.
         It makes two plays for every empty cell on the board:
         - One for the grass state and one for the tent state
-        Then, for each of them, it automatically updates the board with the automatic grass and tent placement.
-        The two resulting boards are compared:
+        Then, for each of them, it propagates the consequences (see _propagate()) and makes an exclusion play.
+        The two resulting boards are compared (see _case_result()):
         - all the cells that have the same state on both boards will be set as that state on the actual game board.
-        """
-        for y in range(1, self._h):
-            for x in range(1, self._w):
-                if self._cell_state(x, y) == "Empty":
-                    tent_case = deepcopy(self)
-                    tent_case.set_cell(x, y, "Tent")
-                    grass_case = deepcopy(self)
-                    grass_case.set_cell(x, y, "Grass")
-
-                    # x and y are set to 1 because they're all automatic plays, they don't actually need a position
-                    tent_case.play(1, 1, tent_case.get_command_keys("AutoGrass")[0])
-                    tent_case.play(1, 1, tent_case.get_command_keys("AutoTent")[0])
-                    tent_case.play(1, 1, tent_case.get_command_keys("ExclusionPlay")[0])
-                    grass_case.play(1, 1, grass_case.get_command_keys("AutoGrass")[0])
-                    grass_case.play(1, 1, grass_case.get_command_keys("AutoTent")[0])
-                    grass_case.play(1, 1, grass_case.get_command_keys("ExclusionPlay")[0])
-
-
-                    tent_case = tent_case.get_disconnected_board()
-                    grass_case = grass_case.get_disconnected_board()
-
-                    for i, (state1, state2) in enumerate(zip(tent_case, grass_case)):
-                        if state1 == state2:
-                            self._board[i] = state1
+        - if one of them is wrong, all the cells of the other one are set
+        The cases are compared on the disconnected boards, so the game board is disconnected first.
+
+        The cells are looked at in order, each one on the board left by the cells before it. With several
+        workers (see self.workers) the next cells are evaluated in advance by other processes, on the current board:
+        when a cell finds something, the results of the cells after it are thrown away and they're evaluated again
+        on the new board. So the result is exactly the same with any number of workers.
+        Only one cell for every worker is evaluated in advance: after a cell finds something the board usually
+        changes a lot, so at most a cell for every worker is wasted (and cancelling doesn't wait for more).
+        The worker processes are kept between plays (see casespool.py).
+        Like in _exclusion_play(), the board is propagated once at the beginning, and only the cells found by
+        comparing the cases are set on the game board.
+        """
+        self._load_board(self.get_disconnected_board())
+
+        mark = self.snapshot()
+        self._propagate(tuple(RULES))
+        found = {}
+        cells = [i for i in range(self._w * self._h) if self._board[i] == EMPTY]
+        start = 0
+        while True:
+            for k, changes in self._case_results(cells, start):
+                if changes:
+                    for j, number in changes.items():
+                        self._set(j, number)
+                    found.update(changes)
+                    self._propagate(tuple(RULES), list(changes))
+                    start = k + 1
+                    break  # The cells after this one must be evaluated on the new board
+            else:
+                break
+        self.restore(mark)
+
+        for i, number in found.items():
+            self._set(i, number)
+
+    def _case_results(self, cells: list[int], start: int):
+        """
+        Generates (position in cells, result of _case_result()) for the cells from start on that are still empty,
+        in order.
+        With a single worker, every cell is evaluated only when it's needed. Otherwise they're evaluated by the
+        worker processes (see casespool.py), up to a cell for every worker ahead of the one being looked at:
+        the cells not needed anymore are cancelled when the generator is closed.
+        """
+        pending = [k for k in range(start, len(cells)) if self._board[cells[k]] == EMPTY]
+        if self.workers <= 1:
+            for k in pending:
+                self._report_progress(k, len(cells))
+                yield k, self._case_result(cells[k])
+            return
+
+        results = self._cases_pool.results(self.workers, self._board, self._w, self._h, [cells[k] for k in pending])
+        try:
+            for k, result in zip(pending, results):
+                self._report_progress(k, len(cells))
+                yield k, result
+        finally:
+            results.close()
+
+    def _case_result(self, i: int) -> dict[int, int]:
+        """
+        Tries the empty cell at index i as a tent and as grass (see _cases_play()). The board must be propagated.
+        Returns the cells that are sure (index -> number) and not already set on the board.
+        """
+        x, y = i % self._w, i // self._w
+        tent_wrong, tent_case = self._try_case(x, y, "Tent", True)
+        grass_wrong, grass_case = self._try_case(x, y, "Grass", True)
+        if tent_wrong and grass_wrong:
+            return {}  # The board is wrong
+
+        if tent_wrong or grass_wrong:
+            changes = grass_case if tent_wrong else tent_case
+        else:
+            # Cells changed in neither case already have the same state on both boards
+            changes = {}
+            for j in tent_case.keys() | grass_case.keys():
+                state1 = tent_case.get(j, self._board[j])
+                state2 = grass_case.get(j, self._board[j])
+                if state1 == state2:
+                    changes[j] = state1
+        return {j: number for j, number in changes.items() if DISCONNECT[self._board[j]] != number}
+
+    def set_progress(self, callback):
+        """
+        Sets the callback called by the slow automatic plays (ExclusionPlay and CasesPlay) before every cell
+        they look at, as callback(done, total), with done and total counted in cells. None removes it.
+        The callback can stop the play by raising an exception: the board is then left half played, so this
+        must only be done on a copy() of the game (see background.py).
+        """
+        self._progress = callback
+
+    def _report_progress(self, done: int = None, total: int = None):
+        """
+        Passes the progress to the callback, if any.
+        The plays made while trying a case are part of a single cell of the outermost play, so they call this
+        without arguments, to pass its progress again (the callback is still called often, so it can stop the
+        play quickly).
+        """
+        if self._progress is not None:
+            if done is not None:
+                self._outer_progress = done, total
+            self._progress(*self._outer_progress)
+
+    def _try_case(self, x: int, y: int, state: str, exclusion: bool = False) -> tuple[bool, dict[int, int]]:
+        """
+        Sets the cell at (x, y) as state, propagates its consequences (see _propagate()) and, if exclusion is
+        True, makes an exclusion play. The board must already be propagated: only the consequences of this cell
+        are looked for.
+        All the changes are then undone, so the board is left as it was.
+        Returns whether the resulting board was wrong and a dictionary with the resulting state of every
+        changed cell (index -> number, with trees and tents disconnected).
+        The result only depends on the board the plays start from, so it's kept in the transposition table:
+        when the same board is reached again (even setting another cell), the plays aren't made at all.
+        """
+        i, number = y * self._w + x, self._get_state_number(state)
+        key = self._hash ^ self._zobrist[SLOTS[self._board[i]]][i] ^ self._zobrist[SLOTS[number]][i], exclusion
+        cached = self.deductions.get(key)
+        if cached is None:
+            mark = self.snapshot()
+            self._set(i, number)
+            start = len(self._trail)
+            self._propagate(tuple(RULES), [i])
+            if exclusion:
+                self._exclusion_play(propagated=True)
+
+            # Only the changes made by the plays are stored: the set cell may be another one, next time
+            cached = self.wrong(), {j: DISCONNECT[self._board[j]] for j, _ in self._trail[start:]}
+            self.restore(mark)
+            self.deductions.put(key, cached)
+
+        wrong, changes = cached
+        return wrong, {i: number} | changes
+
+    def snapshot(self) -> int:
+        """
+        Starts recording the changes made to the board.
+        Returns a mark that must be passed to restore() to bring the board back to the current state.
+        Snapshots can be nested, but they must be restored in reverse order.
+        Unlike a copy of the game, a snapshot costs almost nothing: only the cells changed afterward are recorded
+        (and the connection cache is copied, which is a single byte per cell).
+        """
+        self._snapshots += 1
+        connected = self._connected[:] if self._connected is not None else None
+        self._connection_stack.append((connected, self._filled[:]))
+        return len(self._trail)
+
+    def restore(self, mark: int):
+        """
+        Undoes all the changes made after the snapshot that returned mark.
+        """
+        while len(self._trail) > mark:
+            i, number = self._trail.pop()
+            self._write(i, number)
+        self._snapshots -= 1
+        self._connected, self._filled = self._connection_stack.pop()
+
+    def solve(self) -> bytearray | None:
+        """
+        Solves the puzzle starting from the current board, with a depth-first search that propagates
+        the rules after every guess (see solver.py).
+        Returns the solved board (in the same format as the game board) or None if there is no solution.
+        The game board itself is not modified.
+        """
+        return Solver(self._board, self._w, self._h).solve()
+
+    def count_solutions(self, limit: int = None) -> int:
+        """
+        Returns the number of solutions starting from the current board, stopping after limit solutions.
+        count_solutions(limit=2) == 1 means that the puzzle has a unique solution.
+        """
+        return Solver(self._board, self._w, self._h).count_solutions(limit)
+
+    # -- PROPAGATION --
+    def _propagate(self, rules: tuple[str, ...], seeds: list[int] = None):
+        """
+        Applies the passed rules (names in RULES) until none of them can set any more cells.
+        Every rule looks at a single cell or a single line (row or column), and it only needs to be applied
+        again when that cell, one of its adjacent cells or that line change: the changes made by a rule are
+        collected (see _write) and only the rules subscribed to the changed cells are put back in the agenda.
+        So, the work done is proportional to the cells that change, not to the size of the board.
+        The connection marks are kept updated after every rule, as some rules only look at unconnected trees
+        (see _connected_board()). When nothing is left to do, they're replaced with the ones found from scratch
+        (see get_connected_board()), and the rules woken by the marks that changed are applied too: so the marks
+        left on the board don't depend on the order the cells were set in.
+        seeds are the cells changed since the board was last propagated with these rules: if not passed,
+        the whole board is looked at (the cell rules that can be, as a single bitboard operation).
+        """
+        w, h, bits = self._w, self._h, self._bits
+        changed, self._changed = self._changed, []
+        agenda, waiting = deque(), set()
+
+        def wake(name: str, key: int):
+            if (name, key) not in waiting:
+                waiting.add((name, key))
+                agenda.append((name, key))
+
+        self._load_board(self._connected_board())
+        if seeds is None:
+            if "NearTent" in rules:
+                self._set_all(bits[EMPTY] & dilate8(bits[TENT] | bits[CONNECTED_TENT], w, h), GRASS)
+            if "NoTree" in rules:
+                self._set_all(bits[EMPTY] & ~dilate4(bits[TREE], w, h), GRASS)
+            for name in rules:
+                if RULES[name] == "line":
+                    for k in range(1, w + h):
+                        if k != h:
+                            wake(name, k)
+            if "LonelyTree" in rules:
+                for i in indexes(bits[TREE]):
+                    wake("LonelyTree", i)
+        else:
+            self._changed.extend(seeds)
+
+        while True:
+            if not agenda and not self._changed:
+                self._load_board(self.get_connected_board())  # The marks changed are collected too
+            if self._changed:
+                self._load_board(self._connected_board())  # The marks changed are collected too
+                for i in self._changed:
+                    for name in rules:
+                        if RULES[name] == "line":
+                            wake(name, i // w)
+                            wake(name, h + i % w)
+                        else:
+                            wake(name, i)
+                            for j in self._adjacent[i]:
+                                wake(name, j)
+                self._changed = []
+            if not agenda:
+                break
+            name, key = agenda.popleft()
+            waiting.discard((name, key))
+            getattr(self, RULE_METHODS[name])(key)
+        self._changed = changed
+
+    def _line(self, k: int) -> tuple[tuple[int, ...], int, int, int]:
+        """
+        Returns the line with number k (rows from 1 to h - 1, then column x is h + x) as its cells, its constraint,
+        its tents and its empty cells.
+        """
+        w, h = self._w, self._h
+        if k < h:
+            return tuple(range(k * w + 1, (k + 1) * w)), self._row_constraints[k], self._row_tents[k], self._row_empty[k]
+        x = k - h
+        return tuple(range(w + x, w * h, w)), self._col_constraints[x], self._col_tents[x], self._col_empty[x]
+
+    def _near_tent_rule(self, i: int):
+        """
+        The cells near a tent are grass.
+        """
+        board = self._board
+        if board[i] == TENT or board[i] == CONNECTED_TENT:
+            for j in self._near[i]:
+                if board[j] == EMPTY:
+                    self._set(j, GRASS)
+
+    def _full_line_rule(self, k: int):
+        """
+        The empty cells of a line that already has all its tents are grass.
+        """
+        cells, target, tents, empty = self._line(k)
+        if empty and tents == target:
+            for i in cells:
+                if self._board[i] == EMPTY:
+                    self._set(i, GRASS)
+
+    def _needs_all_rule(self, k: int):
+        """
+        The empty cells of a line that needs all of them to get its tents are tents.
+        """
+        cells, target, tents, empty = self._line(k)
+        if empty and tents + empty == target:
+            for i in cells:
+                if self._board[i] == EMPTY:
+                    self._set(i, TENT)
+
+    def _lonely_tree_rule(self, i: int):
+        """
+        A tree without a tent, with a single adjacent empty cell, has its tent there.
+        Connected tents don't count, they belong to other trees.
+        """
+        board = self._board
+        if board[i] == TREE:
+            adjs = self._adjacent[i]
+            empty = [j for j in adjs if board[j] == EMPTY]
+            if len(empty) == 1 and not any(board[j] == TENT for j in adjs):
+                self._set(empty[0], TENT)
+
+    def _no_tree_rule(self, i: int):
+        """
+        An empty cell without adjacent trees is grass. Connected trees don't count, they already have their tent.
+        """
+        board = self._board
+        if board[i] == EMPTY and not any(board[j] == TREE for j in self._adjacent[i]):
+            self._set(i, GRASS)
+
+    # -- STATS --
+    def enable_stats(self, profile: bool = False, stats: GameStats = None) -> GameStats:
+        """
+        Starts recording the statistics of this game (see stats.py) and returns them (they're also in self.stats):
+        - calls and time of every play action, of every _check_ method and of the connection sweeps
+        - number of sweeps made by get_connected_board()
+        - board copies made by get_connected_board(), _connected_board(), get_disconnected_board() and snapshot()
+        The methods are wrapped only on this instance, so there is no cost at all until this is called.
+        If profile is True, the plays also run under cProfile (see GameStats.dump_profile()).
+        If stats are passed, they are recorded there instead of in new ones (i.e. by the copies of the game, see
+        copy()), and profile is taken from them.
+        """
+        self.disable_stats()
+        stats = self.stats = stats if stats is not None else GameStats(profile)
+
+        class_play, depth = type(self).play, [0]
+        def play(x: int, y: int, action: str):
+            # The profiler is started only by the outermost play (automatic plays call other plays)
+            profile = stats.profiler is not None and depth[0] == 0
+            depth[0] += 1
+            if profile:
+                stats.profiler.enable()
+            start = time.perf_counter()
+            try:
+                class_play(self, x, y, action)
+            finally:
+                stats.record(f"play:{action}", time.perf_counter() - start)
+                if profile:
+                    stats.profiler.disable()
+                depth[0] -= 1
+        self._wrap("play", play)
+
+        for name in dir(type(self)):
+            if name.startswith("_check_"):
+                self._wrap(name, stats.timed(name, getattr(self, name)))
+
+        connect = self._connect
+        def counted_connect(board: bytearray, seeds: list[int]) -> int:
+            sweeps = connect(board, seeds)
+            stats.sweeps += sweeps
+            return sweeps
+        self._wrap("_connect", stats.timed("_connect", counted_connect))
+
+        for name, copies in (("get_connected_board", lambda: True),
+                             ("_connected_board", lambda: True),
+                             ("get_disconnected_board", lambda: True),
+                             ("snapshot", lambda: self._connected is not None)):
+            def copying(*args, method=getattr(self, name), copies=copies):
+                if copies():
+                    stats.copies += 1
+                    stats.copied_bytes += len(self._board)
+                return method(*args)
+            self._wrap(name, stats.timed(name, copying))
+        return stats
+
+    def disable_stats(self):
+        """
+        Stops recording the statistics, removing all the wrappers. self.stats keeps the last ones.
+        """
+        for name in self._wrapped:
+            delattr(self, name)
+        self._wrapped = []
+
+    def _wrap(self, name: str, wrapper):
+        """
+        Replaces the method name of this instance (not of the class) with wrapper.
+        """
+        setattr(self, name, wrapper)
+        self._wrapped.append(name)
 
     def set_cell(self, x: int, y: int, state: str):
         """
@@ -327,21 +832,257 @@ class TentsGame(BoardGame):
         """
         if 1 <= x < self._w and 1 <= y < self._h:
             i = y * self._w + x
-            self._board[i] = self._get_state_number(state)
+            self._set(i, self._get_state_number(state))
+
+    def _set(self, i: int, number: int):
+        """
+        Sets the cell at index i to the passed number, updating the board counters.
+        Every change to the board must go through this method (or _load_board), otherwise the counters
+        used by the check methods will be wrong.
+        If a snapshot is active, the change is recorded in the undo trail.
+        """
+        old = self._board[i]
+        if old == number:
+            return
+        if self._snapshots:
+            self._trail.append((i, old))
+        self._write(i, number)
+
+    def _write(self, i: int, number: int):
+        """
+        Writes the number on the cell at index i, updating the board counters.
+        Only the changed cell and its neighbours are looked at, so it costs O(1).
+        """
+        old = self._board[i]
+        w = self._w
+        x, y = i % w, i // w
+        if self._changed is not None:
+            self._changed.append(i)
+        affected = (i,) + self._adjacent[i]
+
+        self._hash ^= self._zobrist[SLOTS[old]][i] ^ self._zobrist[SLOTS[number]][i]
+        bit = 1 << i
+        self._bits[old] ^= bit
+        self._bits[number] ^= bit
+
+        # Line masks (changing only the connection marks doesn't affect them)
+        old_kind, new_kind = LINE_KINDS[old], LINE_KINDS[number]
+        if old_kind != new_kind:
+            row_bit, col_bit = 1 << (x - 1), 1 << (y - 1)
+            if old_kind == TENT:
+                self._row_tent_mask[y] ^= row_bit
+                self._col_tent_mask[x] ^= col_bit
+            elif old_kind == GRASS:
+                self._row_blocked[y] ^= row_bit
+                self._col_blocked[x] ^= col_bit
+            if new_kind == TENT:
+                self._row_tent_mask[y] |= row_bit
+                self._col_tent_mask[x] |= col_bit
+            elif new_kind == GRASS:
+                self._row_blocked[y] |= row_bit
+                self._col_blocked[x] |= col_bit
+            self._dirty_lines.add(y)
+            self._dirty_lines.add(self._h + x)
+
+        # Connection cache (changing only the connection marks doesn't affect it)
+        if self._connected is not None and DISCONNECT[old] != DISCONNECT[number]:
+            if old == EMPTY:
+                self._filled.append(i)
+            else:
+                self._connected = None
+
+        # Removing the contributions of the old state
+        for j in affected:
+            self._add_flags(j, -1)
+        if old in (TENT, CONNECTED_TENT):
+            self._tents -= 1
+            self._row_tents[y] -= 1
+            self._col_tents[x] -= 1
+            self._tent_contacts -= sum(1 for j in self._near_indexes(i) if self._board[j] in (TENT, CONNECTED_TENT))
+        elif old in (TREE, CONNECTED_TREE):
+            self._trees -= 1
+        elif old == EMPTY:
+            self._row_empty[y] -= 1
+            self._col_empty[x] -= 1
+
+        self._board[i] = number
+
+        # Adding the contributions of the new state
+        if number in (TENT, CONNECTED_TENT):
+            self._tents += 1
+            self._row_tents[y] += 1
+            self._col_tents[x] += 1
+            self._tent_contacts += sum(1 for j in self._near_indexes(i) if self._board[j] in (TENT, CONNECTED_TENT))
+        elif number in (TREE, CONNECTED_TREE):
+            self._trees += 1
+        elif number == EMPTY:
+            self._row_empty[y] += 1
+            self._col_empty[x] += 1
+        for j in affected:
+            self._add_flags(j, 1)
+
+    def _set_all(self, mask: int, number: int):
+        """
+        Sets all the cells in the mask (a bitboard) to the passed number.
+        """
+        for i in indexes(mask):
+            self._set(i, number)
+
+    def _load_board(self, board: bytearray):
+        """
+        Replaces the board with the passed one (which must have the same size).
+        Only the cells that differ are written: they are found with a XOR of the two boards read as big integers,
+        so when only a few cells differ the cost doesn't depend on the size of the board.
+        """
+        diff = int.from_bytes(self._board, "little") ^ int.from_bytes(board, "little")
+        while diff:
+            i = ((diff & -diff).bit_length() - 1) // 8  # Lowest byte that differs
+            self._set(i, board[i])
+            diff &= ~(0xFF << (i * 8))
+
+    def copy(self) -> "TentsGame":
+        """
+        Returns a new game with a copy of the current board (without progress callback).
+        The transposition table and the worker processes of CasesPlay are shared, as the level is the same.
+        If the statistics are enabled, the copy records them too, in the same GameStats: so the plays made on a
+        copy (i.e. in the background, see background.py) are counted as plays of this game.
+        """
+        game = TentsGame(board=self._board, w=self._w, h=self._h)
+        game.deductions = self.deductions
+        game.workers = self.workers
+        game._cases_pool = self._cases_pool
+        if self._wrapped:
+            game.enable_stats(stats=self.stats)
+        return game
+
+    def close(self):
+        """
+        Stops the worker processes of CasesPlay, if they were started (see self.workers). They're shared with
+        the copies of the game, so they're stopped for them too (and started again if they're needed).
+        """
+        self._cases_pool.close()
+
+    def get_board(self) -> bytearray:
+        """
+        Returns a copy of the board as it is (trees and tents are left connected or not).
+        """
+        return self._board[:]
+
+    def set_board(self, board: bytearray):
+        """
+        Replaces the board with the passed one, i.e. the result of a play made on a copy() of the game.
+        It must have the same size and the same constraints.
+        """
+        if len(board) != len(self._board):
+            raise ValueError("The board has a different size")
+        self._load_board(board)
+
+    # -- COUNTERS --
+    def _init_counters(self):
+        """
+        Computes from scratch all the counters used by the check methods.
+        They are then kept updated by _set, so that finished(), wrong() and status() don't need to
+        scan the whole board.
+        - Number of tents and empty cells for every row and column
+        - Number of trees and tents on the board
+        - Number of pairs of near (diagonal is valid) tents
+        - Number of trees/tents that break one of the adjacency rules (see _cell_flags)
+        - Masks of the tents and of the blocked cells of every row and column, and the lines that can't be
+          completed (see _check_lines())
+        """
+        w, h = self._w, self._h
+        self._row_tents, self._row_empty = [0] * h, [0] * h
+        self._col_tents, self._col_empty = [0] * w, [0] * w
+        # Line masks in the format of lines.solve_line() (bit x - 1 of a row, bit y - 1 of a column), as in Solver
+        self._row_tent_mask, self._row_blocked = [0] * h, [0] * h
+        self._col_tent_mask, self._col_blocked = [0] * w, [0] * w
+        self._dirty_lines = set(range(1, h)) | set(range(h + 1, h + w))  # Line numbers as in _line()
+        self._bad_lines = set()
+        self._trees, self._tents = 0, 0
+        self._tent_contacts = 0
+        self._trees_without_tent, self._tents_without_tree = 0, 0
+        self._dead_trees, self._lonely_tents = 0, 0
+
+        for y in range(1, h):
+            for x in range(1, w):
+                i = y * w + x
+                number = self._board[i]
+                if number in (TENT, CONNECTED_TENT):
+                    self._tents += 1
+                    self._row_tents[y] += 1
+                    self._col_tents[x] += 1
+                    self._row_tent_mask[y] |= 1 << (x - 1)
+                    self._col_tent_mask[x] |= 1 << (y - 1)
+                    # Every pair is found twice
+                    self._tent_contacts += sum(1 for j in self._near_indexes(i) if self._board[j] in (TENT, CONNECTED_TENT))
+                elif number == EMPTY:
+                    self._row_empty[y] += 1
+                    self._col_empty[x] += 1
+                else:
+                    if number in (TREE, CONNECTED_TREE):
+                        self._trees += 1
+                    self._row_blocked[y] |= 1 << (x - 1)
+                    self._col_blocked[x] |= 1 << (y - 1)
+                self._add_flags(i, 1)
+        self._tent_contacts //= 2
+
+    def _cell_flags(self, i: int) -> tuple[bool, bool, bool, bool]:
+        """
+        Returns which adjacency rules are broken by the cell at index i:
+        - A tree (connected or not) without adjacent tents (connected or not)
+        - A tent (connected or not) without adjacent trees (connected or not)
+        - A not connected tree without adjacent not connected tents and without adjacent empty cells
+        - A not connected tent without adjacent not connected trees
+        The first two are used by finished(), the last two by wrong().
+        """
+        number = self._board[i]
+        if number not in (TREE, CONNECTED_TREE, TENT, CONNECTED_TENT):
+            return False, False, False, False
+        adjs = [self._board[j] for j in self._adjacent_indexes(i)]
+        if number in (TREE, CONNECTED_TREE):
+            no_tent = TENT not in adjs and CONNECTED_TENT not in adjs
+            return no_tent, False, number == TREE and TENT not in adjs and EMPTY not in adjs, False
+        no_tree = TREE not in adjs and CONNECTED_TREE not in adjs
+        return False, no_tree, False, number == TENT and TREE not in adjs
+
+    def _add_flags(self, i: int, sign: int):
+        """
+        Adds (sign = 1) or removes (sign = -1) the flags of the cell at index i from the counters.
+        """
+        if self._board[i] not in (TREE, CONNECTED_TREE, TENT, CONNECTED_TENT):
+            return
+        tree_without_tent, tent_without_tree, dead_tree, lonely_tent = self._cell_flags(i)
+        self._trees_without_tent += sign * tree_without_tent
+        self._tents_without_tree += sign * tent_without_tree
+        self._dead_trees += sign * dead_tree
+        self._lonely_tents += sign * lonely_tent
 
     # -- UTILITY METHODS --
     def _count_trees(self) -> int:
         """
         Returns total number of trees in the board
         """
-        return self._board.count(self._get_state_number("Tree")) + self._board.count(self._get_state_number("ConnectedTree"))
+        return self._trees
 
     def _count_tents(self) -> int:
         """
         Returns total number of tents in the board
         """
-        return self._board.count(self._get_state_number("Tent")) + self._board.count(self._get_state_number("ConnectedTent"))
+        return self._tents
 
+    def _adjacent_indexes(self, i: int) -> tuple[int, ...]:
+        """
+        Returns the indexes of the cells adjacent (not diagonal) to the cell at index i.
+        Constraint cells are excluded.
+        """
+        return self._adjacent[i]
+
+    def _near_indexes(self, i: int) -> tuple[int, ...]:
+        """
+        Returns the indexes of the cells near (diagonal is valid) the cell at index i.
+        Constraint cells are excluded.
+        """
+        return self._near[i]
 
     def _cell_number(self, x: int, y: int) -> int:
         """
@@ -386,51 +1127,50 @@ class TentsGame(BoardGame):
         """
         Returns a list of all the cells in the specified column.
         """
-        col = []
-        i = x
-        for _ in range(self._h):
-            col.append(self._board[i])
-            i += self._w
-        return col
+        return list(self._board[x::self._w])
 
     def _get_row(self, y: int) -> list[int]:
         """
         Returns a list of all the cells in the specified row.
         """
-        row = []
-        i = y * self._w
-        for _ in range(self._w):
-            row.append(self._board[i])
-            i += 1
-        return row
+        return list(self._board[y * self._w:(y + 1) * self._w])
+
+    def _lines(self) -> list[tuple[list[int], int]]:
+        """
+        Returns every row and every column (constraints excluded) as a pair: the list of its indexes and its constraint.
+        """
+        w, h = self._w, self._h
+        rows = [([y * w + x for x in range(1, w)], self._row_constraints[y]) for y in range(1, h)]
+        cols = [([y * w + x for y in range(1, h)], self._col_constraints[x]) for x in range(1, w)]
+        return rows + cols
+
+    def _line_masks(self, line: list[int]) -> tuple[int, int]:
+        """
+        Returns the masks of the tents and of the cells that can't be tents (trees and grass) in the line,
+        in the format used by lines.solve_line().
+        """
+        board = self._board
+        tents, blocked = 0, 0
+        for k, i in enumerate(line):
+            if board[i] == TENT or board[i] == CONNECTED_TENT:
+                tents |= 1 << k
+            elif board[i] != EMPTY:
+                blocked |= 1 << k
+        return tents, blocked
 
     def get_near_cells(self, x: int, y: int) -> list[int]:
         """
         Returns an unordered list of all the cells near the cell at the passed coordinates.
         Diagonal cells are included.
         """
-        adjs = []
-        for dx in (-1, 0, 1):
-            for dy in (-1, 0, 1):
-                adj_x, adj_y = x + dx, y + dy
-                adj_i = adj_y * self._w + adj_x
-                if self._check_out_of_bounds(adj_x, adj_y):
-                    if dx != 0 or dy != 0:  # The center cell is not considered
-                        adjs.append(self._board[adj_i])
-        return adjs
+        return [self._board[j] for j in self._near[y * self._w + x]]
 
     def get_adjacent_cells(self, x: int, y: int) -> list[int]:
         """
         Returns an unordered list of all the cells adjacent to the cell at the passed coordinates.
         Diagonal cells are excluded.
         """
-        adjs = []
-        for dx, dy in ((-1, 0), (0, -1), (1, 0), (0, 1)):
-            adj_x, adj_y = x + dx, y + dy
-            adj_i = adj_y * self._w + adj_x
-            if self._check_out_of_bounds(adj_x, adj_y):
-                adjs.append(self._board[adj_i])
-        return adjs
+        return [self._board[j] for j in self._adjacent[y * self._w + x]]
 
     def get_command_keys(self, action: str) -> list[str]:
         """
@@ -457,7 +1197,7 @@ class TentsGame(BoardGame):
         """
         self._w = 0
         self._h = 0
-        self._board = []
+        self._board = bytearray()
 
         with open(filename, "r") as file:
             for line in file:
@@ -473,15 +1213,34 @@ class TentsGame(BoardGame):
                 for c in line:
                     match c:
                         case ".":
-                            self._board.append(0)
+                            self._board.append(EMPTY)
                         case "T":
-                            self._board.append(1)
+                            self._board.append(TREE)
                         case c if "0" <= c <= "9":
-                            self._board.append(int(c) + 90) # Digits are represented as themselves + 90
+                            self._board.append(int(c) + NUMBER) # Digits are represented as themselves + 90
+
+            self._board[0] = NULL # Ignore first cell
+
+        self._load_level(self._board, self._w, self._h)
+
+    def _load_level(self, board: bytearray, w: int, h: int):
+        """
+        Starts a level with the passed board (w * h cells, constraints included).
+        """
+        self._w, self._h = w, h
+        self._board = board
+        self._row_constraints = [0] + [board[y * w] - NUMBER for y in range(1, h)]
+        self._col_constraints = [0] + [board[x] - NUMBER for x in range(1, w)]
+        self._adjacent, self._near = neighbour_tables(w, h)
+        self._zobrist = zobrist_keys(len(board))
+        self._hash = zobrist_hash(board)
+        self._bits = [0] * 256
+        for number in set(board):
+            self._bits[number] = board_mask(board, (number,))
 
-            self._board[0] = -1 # Ignore first cell
+        self._init_counters()
 
-    def get_connected_board(self):
+    def get_connected_board(self) -> bytearray:
         """
         Method that takes the board with Trees and Tents (the rest will be ignored) and it returns the same list but
         with marked Tents and Trees that are unambiguously connected together.
@@ -490,67 +1249,97 @@ class TentsGame(BoardGame):
 
         If there already are marked trees or tents, they will first be converted to normal trees/tents, so if they
         are no longer connected they will be reset.
+
+        The result only depends on the board: the connections are always looked for from scratch (see
+        _connected_board() for the faster version used while propagating).
         """
         # Creates a copy of the board, with all trees and tents disconnected from each other.
-        board = self.get_disconnected_board()
-
-        # Marking actually connected trees and tents
-        found = True
-        while found:
-            found = False
-            # Found is used for repeating the connected check until there's nothing that can be done.
-            # When a connection is found, the code will iterate once again.
-
-            for y in range(1, self._h):
-                for x in range(1, self._w):
-                    i = y * self._w + x
-                    if board[i] == 1:  # This is a tree
-                        # To be unambiguously connected, a tree must be adjacent to a single tent and there must not be
-                        # any empty cells adjacent to it.
-                        adjs = get_adjacencies(board, self._w, self._h, x, y)
-
-                        tent_adjs = [pos for n, pos in adjs if n == 2]
-                        empty_adjs = [pos for n, pos in adjs if n == 0]
-
-                        if len(tent_adjs) == 1 and len(
-                                empty_adjs) == 0:  # The connection is unambiguous if there's only 1 tent and no empty cells
-                            # if len(tent_adjs) == 1:
-                            found = True
-                            board[i] = 11  # So the tree will be connected
-                            tent = tent_adjs[0]  # Get the tent (we know for a fact it's only one)
-
-                            # Since it's only one tent, I extract it from the list
-                            tent_x, tent_y = tent
-                            tent_i = tent_y * self._w + tent_x
-                            board[tent_i] = 12  # Mark the tent as connected
-
-                    elif board[i] == 2:  # This is a tent
-                        # To be unambiguously connected, a tent must be adjacent to only one three.
-                        adjs = get_adjacencies(board, self._w, self._h, x, y)
-                        tree_adjs = [pos for n, pos in adjs if n == 1]
-                        if len(tree_adjs) == 1:
-                            found = True
-                            board[i] = 12
-                            tree = tree_adjs[0]  # The tree is only one
-                            tree_x, tree_y = tree
-                            tree_i = tree_y * self._w + tree_x
-                            board[tree_i] = 11
-
-        return board
-
-    def get_disconnected_board(self):
+        # All trees and tents will be checked, in the same order as the board (the other cells are never connected).
+        self._connected, self._filled = self.get_disconnected_board(), []
+        bits = self._bits
+        self._connect(self._connected, indexes(bits[TREE] | bits[TENT] | bits[CONNECTED_TREE] | bits[CONNECTED_TENT]))
+        return self._connected[:]
+
+    def _connected_board(self) -> bytearray:
+        """
+        Returns the board with the connections marked, like get_connected_board(), but starting from the connection
+        cache (see __init__): after a few cells have been filled only their surroundings are checked.
+        So the connections can differ from the ones found from scratch.
+        """
+        if self._connected is None:
+            return self.get_connected_board()
+
+        # Only the filled cells and their adjacent cells need to be checked again
+        seeds = []
+        for i in self._filled:
+            self._connected[i] = self._board[i]
+            seeds.append(i)
+            seeds.extend(self._adjacent_indexes(i))
+        self._filled = []
+
+        self._connect(self._connected, seeds)
+        return self._connected[:]
+
+    def _connect(self, board: bytearray, seeds: list[int]):
+        """
+        Marks on the passed board the trees and tents that are unambiguously connected, checking the seed cells.
+        It uses a worklist: when a tree and a tent are connected, only their adjacent cells are checked again
+        (they are the only ones whose adjacent trees/tents have changed).
+        The worklist is ordered as (sweep, index), so cells are checked in the same order as repeated sweeps of the
+        whole board would do: a cell after the current one is checked in this sweep, a cell before it in the next one.
+        Returns the number of sweeps made.
+        """
+        sweep = -1
+        queue = [(0, i) for i in seeds]
+        heapify(queue)
+        while queue:
+            sweep, i = heappop(queue)
+            if board[i] == TREE:
+                # To be unambiguously connected, a tree must be adjacent to a single tent and there must not be
+                # any empty cells adjacent to it.
+                adjs = self._adjacent_indexes(i)
+                tent_adjs = [j for j in adjs if board[j] == TENT]
+                if len(tent_adjs) == 1 and not any(board[j] == EMPTY for j in adjs):
+                    tree_i, tent_i = i, tent_adjs[0]
+                else:
+                    continue
+
+            elif board[i] == TENT:
+                # To be unambiguously connected, a tent must be adjacent to only one three.
+                tree_adjs = [j for j in self._adjacent_indexes(i) if board[j] == TREE]
+                if len(tree_adjs) == 1:
+                    tree_i, tent_i = tree_adjs[0], i
+                else:
+                    continue
+            else:
+                continue
+
+            board[tree_i] = CONNECTED_TREE
+            board[tent_i] = CONNECTED_TENT
+            for j in self._adjacent_indexes(tree_i) + self._adjacent_indexes(tent_i):
+                if board[j] == TREE or board[j] == TENT:  # Only they can be connected
+                    heappush(queue, (sweep if j > i else sweep + 1, j))
+        return sweep + 1
+
+    def get_matching(self) -> dict[int, int] | None:
+        """
+        Pairs every tree with its own adjacent tent, using a maximum matching (see matching.py).
+        Returns the pairs as a dictionary (tree index -> tent index), or None if it's not possible to pair
+        all the trees and all the tents.
+        """
+        board, w = self._board, self._w
+        trees = [y * w + x for y in range(1, self._h) for x in range(1, w) if board[y * w + x] in (TREE, CONNECTED_TREE)]
+        adj = {t: [j for j in self._adjacent_indexes(t) if board[j] in (TENT, CONNECTED_TENT)] for t in trees}
+        matching = hopcroft_karp(adj)
+        if len(matching) != len(trees) or len(trees) != self._tents:
+            return None
+        return matching
+
+    def get_disconnected_board(self) -> bytearray:
         """
         Makes a copy of the passed board with all tents and trees disconnected from each other.
         """
-        board = self._board[:]
-
-        for y in range(self._h):
-            for x in range(self._w):
-                i = y * self._w + x
-                if board[i] == 11 or board[i] == 12:  # 11: Tree, # 12: Tent
-                    board[i] -= 10
-
-        return board
+        return self._board.translate(DISCONNECT)
 
     # -- CHECK METHODS --
     def _check_equity(self) -> bool:
@@ -559,6 +1348,13 @@ class TentsGame(BoardGame):
         """
         return self._count_trees() == self._count_tents()
 
+    def _check_matching(self) -> bool:
+        """
+        Checks that every tree has its own adjacent tent, and every tent its own adjacent tree.
+        (The other checks only compare the counts and look at the single trees/tents)
+        """
+        return self.get_matching() is not None
+
     def _check_out_of_bounds(self, x: int, y: int) -> bool:
         """
         Checks that the cell at (x, y) is a valid cell.
@@ -571,11 +1367,8 @@ class TentsGame(BoardGame):
         Returns True if there is at least one adjacent (not diagonal) cell of type state.
         Otherwise, returns False.
         """
-        for adj_x, adj_y in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
-            if self._check_out_of_bounds(adj_x, adj_y): # Se è fuori, siamo a bordo e si può ignorare
-                if self._cell_state(adj_x, adj_y) == state:
-                    return True
-        return False
+        number = self._get_state_number(state)
+        return any(self._board[j] == number for j in self._adjacent[y * self._w + x])
 
     def _check_if_is_near(self, x: int, y: int, state: str) -> bool:
         """
@@ -583,19 +1376,14 @@ class TentsGame(BoardGame):
         Otherwise, returns False.
         Diagonal cells are included.
         """
-        for dx in (-1, 0, 1):
-            for dy in (-1, 0, 1):
-                near_x, near_y = x + dx, y + dy
-                if (near_x, near_y) != (x, y) and self._check_out_of_bounds(near_x, near_y): # The central cell will not be checked
-                    if self._cell_state(near_x, near_y) == state:
-                        return True
-        return False
+        number = self._get_state_number(state)
+        return any(self._board[j] == number for j in self._near[y * self._w + x])
 
     def _check_tree_adjacency(self, x: int, y: int) -> bool:
         """
         Checks if the passed tree at (x, y) has at least one adjacent (not diagonal) cell.
         """
-        if self._cell_state(x, y) != "Tree" and self._cell_state(x, y) != "ConnectedTree":
+        if self._cell_number(x, y) not in (TREE, CONNECTED_TREE):
             raise ValueError("Not a tree")
 
         return self._check_if_is_adjacent(x, y, "Tent") or self._check_if_is_adjacent(x, y, "ConnectedTent")
@@ -604,18 +1392,13 @@ class TentsGame(BoardGame):
         """
         Checks if all trees have at least one adjacent (not diagonal) tent.
         """
-        for i in range(self._h):
-            for j in range(self._w):
-                # If Tree is in the string of cell state, then it must be a Tree or a ConnectedTree
-                if "Tree" in self._cell_state(i, j) and not self._check_tree_adjacency(i, j):
-                    return False
-        return True
+        return self._trees_without_tent == 0
 
     def _check_tent_adjacency(self, x: int, y: int) -> bool:
         """
         Checks if the passed tent has at least one adjacent (not diagonal) tree.
         """
-        if self._cell_state(x, y) != "Tent" and self._cell_state(x, y) != "ConnectedTent":
+        if self._cell_number(x, y) not in (TENT, CONNECTED_TENT):
             raise ValueError("Not a tent")
 
         return self._check_if_is_adjacent(x, y, "Tree") or self._check_if_is_adjacent(x, y, "ConnectedTree")
@@ -624,7 +1407,7 @@ class TentsGame(BoardGame):
         """
         Checks if the passed tent has at least one near (diagonal is valid) tent.
         """
-        if self._cell_state(x, y) != "Tent" and self._cell_state(x, y) != "ConnectedTent":
+        if self._cell_number(x, y) not in (TENT, CONNECTED_TENT):
             raise ValueError("Not a tent")
         return self._check_if_is_near(x, y, "Tent") or self._check_if_is_near(x, y, "ConnectedTent")
 
@@ -632,21 +1415,13 @@ class TentsGame(BoardGame):
         """
         Checks if all tents have at least one adjacent (not diagonal) tree.
         """
-        for i in range(self._h):
-            for j in range(self._w):
-                if "Tent" in self._cell_state(i, j) and not self._check_tent_adjacency(i, j):
-                    return False
-        return True
+        return self._tents_without_tree == 0
 
     def _check_all_tents_vicinity(self) -> bool:
         """
         Checks if all tents have no near (diagonal is valid) tent.
         """
-        for i in range(self._h):
-            for j in range(self._w):
-                if "Tent" in self._cell_state(i, j) and self._check_tent_vicinity(i, j):
-                    return False
-        return True
+        return self._tent_contacts == 0
 
     def _check_row_constraint(self, row: int):
         """
@@ -656,9 +1431,7 @@ class TentsGame(BoardGame):
         if row == 0:
             raise ValueError("You can't pass the constraint row.")
 
-        tent_number, *cells = [c for c in self._get_row(row)]
-        tent_number -= 90  # Because numbers are set as 90 + the actual number
-        return tent_number == cells.count(self._get_state_number("Tent")) + cells.count(self._get_state_number("ConnectedTent"))
+        return self._row_constraints[row] == self._row_tents[row]
 
     def _check_row_constraints(self):
         """
@@ -676,9 +1449,7 @@ class TentsGame(BoardGame):
         if col == 0:
             raise ValueError("You can't pass the constraint column.")
 
-        tent_number, *cells = [r for r in self._get_column(col)]
-        tent_number -= 90  # Because numbers are set as 90 + the actual number
-        return tent_number == cells.count(self._get_state_number("Tent")) + cells.count(self._get_state_number("ConnectedTent"))
+        return self._col_constraints[col] == self._col_tents[col]
 
     def _check_col_constraints(self):
         """
@@ -696,9 +1467,7 @@ class TentsGame(BoardGame):
         If this is false, at least a cell must be set to empty to solve the game.
         """
         for y in range(1, self._h):
-            tent_number, *cells = self._get_row(y)
-            empty_cells = [cell for cell in cells if cell == self._get_state_number("Empty")]
-            if len(empty_cells) == 0:
+            if self._row_empty[y] == 0:
                 if self._check_row_constraint(y) == False:
                     return False
         return True
@@ -710,9 +1479,7 @@ class TentsGame(BoardGame):
         If this is false, at least a cell must be set to empty to solve the game.
         """
         for x in range(1, self._w):
-            tent_number, *cells = self._get_column(x)
-            empty_cells = [cell for cell in cells if cell == self._get_state_number("Empty")]
-            if len(empty_cells) == 0:
+            if self._col_empty[x] == 0:
                 if self._check_col_constraint(x) == False:
                     return False
         return True
@@ -725,49 +1492,48 @@ class TentsGame(BoardGame):
         """
         # Rows
         for y in range(1, self._h):
-            row = self._get_row(y)
-            tent_number, *cells = row
-            tent_number -= 90
-            tents = [c for c in cells if c == self._get_state_number("Tent") or c == self._get_state_number("ConnectedTent")]
-
-            if len(tents) > tent_number:
+            if self._row_tents[y] > self._row_constraints[y]:
                 return False
 
         for x in range(1, self._w):
-            col = self._get_column(x)
-            tent_number, *cells = col
-            tent_number -= 90
-            tents = [c for c in cells if c == self._get_state_number("Tent") or c == self._get_state_number("ConnectedTent")]
-
-            if len(tents) > tent_number:
+            if self._col_tents[x] > self._col_constraints[x]:
                 return False
 
         return True
 
+    def _check_lines(self) -> bool:
+        """
+        Checks if every row and column can still get its number of tents without tents touching each other.
+        Example (g: grass, _: empty): 3 -> gggg____
+        Here 3 tents can't be placed, they would always touch.
+        Only the lines changed since the last call are checked again (see _write()): the others keep their result.
+        """
+        w, h = self._w, self._h
+        for k in self._dirty_lines:
+            if k < h:
+                forced = solve_line(w - 1, self._row_constraints[k], self._row_tent_mask[k], self._row_blocked[k])
+            else:
+                x = k - h
+                forced = solve_line(h - 1, self._col_constraints[x], self._col_tent_mask[x], self._col_blocked[x])
+            if forced is None:
+                self._bad_lines.add(k)
+            else:
+                self._bad_lines.discard(k)
+        self._dirty_lines.clear()
+        return not self._bad_lines
+
     def _check_wrong_tree(self):
         """
         Returns false if any tree on the board has no tents around it and has no adjacent empty cells.
         """
-        for y in range(1, self._h):
-            for x in range(1, self._w):
-                if self._cell_state(x, y) == "Tree":
-                    adjs = self.get_adjacent_cells(x, y)
-                    if self._get_state_number("Tent") not in adjs and self._get_state_number("Empty") not in adjs:
-                        return False
-        return True
+        return self._dead_trees == 0
 
     def _check_wrong_tent(self):
         """
         Returns false if there's a tent without a tree around it.
         Returns true otherwise.
         """
-        for y in range(1, self._h):
-            for x in range(1, self._w):
-                if self._cell_state(x, y) == "Tent":
-                    trees = [c for c in self.get_adjacent_cells(x, y) if c == self._get_state_number("Tree")]
-                    if len(trees) == 0:
-                        return False
-        return True
+        return self._lonely_tents == 0
 
     def wrong(self):
         """
@@ -788,20 +1554,21 @@ class TentsGame(BoardGame):
             self._check_all_tents_vicinity(),
             self._check_tents_below_constraint(),
             self._check_wrong_tree(),
-            self._check_wrong_tent()
+            self._check_wrong_tent(),
+            self._check_lines()  # Last, as it's the only one that looks at every cell
 
             #TODO: Verificare che ci siano TUTTI i possibili casi di board invalida.
-
-            #TODO: Inserire caso in cui le celle libere sono tutte adiacenti e non permettono
-            # il piazzamento di tutte le tende.
-            # Esempio (g: grass, t: tent, _: empty): 3 -> gggg____
-            #  Qui non si possono piazzare 3 tende, si toccherebbero sempre.
         ))
 
 def tents_gui_play(game_instance: TentsGame):
+    # The GUI modules are imported only here, so that the game can be used without them (see tents.py)
+    import g2d
+    from tentsgui import TentsGui
+
     g2d.init_canvas((game_instance.cols() * W, game_instance.rows() * H + H))
-    ui = BoardGameGui(game_instance, game_instance.ACTIONS, game_instance.ANNOTS)
-    g2d.main_loop(ui.tick)
+    ui = TentsGui(game_instance, game_instance.ACTIONS, game_instance.ANNOTS)
+    g2d.main_loop(ui.tick, mode="on_event")
+    game_instance.close()
 
 if __name__ == "__main__":
     game = TentsGame("levels/tents-2025-11-27-16x16-easy.txt")
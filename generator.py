@@ -0,0 +1,181 @@
+"""
+Generator of Tents levels with a unique solution.
+
+A level is made starting from its solution: a random layout of tents that don't touch each other,
+with a tree attached to every tent. The constraints are counted on the layout, then the solver checks
+that the tents can't be placed in any other way. If they can, some trees are moved (see generate()),
+and the layouts that can't be fixed this way are thrown away.
+The levels are saved in the format read by TentsGame._read_file().
+"""
+
+import random
+
+from rating import rate
+from solver import Solver, EMPTY, TREE, TENT, GRASS, NUMBER, NULL
+
+TENT_DENSITY = 0.2  # Tents (and trees) per playable cell, the same as the levels in levels/
+MAX_NODES = 200     # Search budget of the uniqueness check: levels that need more are thrown away
+MAX_REPAIRS = 40    # Trees moved before giving up on a layout
+MAX_ATTEMPTS = 2000  # Layouts tried by generate_level() before giving up
+
+
+def generate(w: int, h: int, rng: random.Random) -> tuple[bytearray, Solver] | None:
+    """
+    Makes a single attempt at generating a level with w * h playable cells.
+    Returns the board (constraints included, so it's (w + 1) * (h + 1) cells) and the solver that proved
+    that its solution is unique, or None if the attempt failed.
+    While the level has other solutions, the trees that allow them are moved around their own tents:
+    the planned solution stays valid, and the cells of the other ones may lose their trees.
+    """
+    bw, bh = w + 1, h + 1
+    layout = _layout(bw, bh, rng)
+    if layout is None:
+        return None
+    board, pairs = layout
+    tents = set(pairs.values())
+
+    for _ in range(MAX_REPAIRS):
+        solver = Solver(board, bw, bh)
+        count = solver.count_solutions(2, MAX_NODES)
+        if solver.gave_up or count == 0:
+            return None
+        if count == 1:
+            return board, solver
+        other = next(found for found in solver.found if any(found[i] != TENT for i in tents))
+        wrong = [i for i in range(len(board)) if other[i] == TENT and i not in tents]
+        if not _move_trees(board, bw, bh, pairs, tents, wrong, rng):
+            return None
+    return None
+
+
+def random_board(w: int, h: int, rng: random.Random, density: float = TENT_DENSITY) -> tuple[bytearray, bytearray]:
+    """
+    Returns a random board with w * h playable cells that has at least a solution (not necessarily unique),
+    i.e. for benchmarks, together with that solution (with grass on all the other cells).
+    Big boards need a lower density, so that the constraints stay single digits.
+    """
+    while True:
+        layout = _layout(w + 1, h + 1, rng, density)
+        if layout is not None:
+            board, pairs = layout
+            solution = bytearray(GRASS if number == EMPTY else number for number in board)
+            for i in pairs.values():
+                solution[i] = TENT
+            return board, solution
+
+
+def _layout(w: int, h: int, rng: random.Random, density: float = TENT_DENSITY) -> tuple[bytearray, dict[int, int]] | None:
+    """
+    Returns a board (w and h include the constraints) with random trees and constraints, and the planned
+    solution as a dictionary tree index -> tent index. The tents are not on the board.
+    Returns None if a constraint would be more than a digit.
+    """
+    board = bytearray(w * h)
+    board[0] = NULL
+
+    # Tents: random cells, skipping the ones near a tent already placed
+    cells = [y * w + x for y in range(1, h) for x in range(1, w)]
+    rng.shuffle(cells)
+    tents = []
+    for i in cells[:int(len(cells) * density * 2)]:
+        if all(board[j] != TENT for j in _near(i, w, h)):
+            board[i] = TENT
+            tents.append(i)
+            if len(tents) == int(len(cells) * density):
+                break
+
+    # Trees: a free adjacent cell for every tent (the tents that don't have one are removed)
+    pairs = {}
+    for i in tents:
+        free = [j for j in _adjacent(i, w, h) if board[j] == EMPTY]
+        if free:
+            tree = rng.choice(free)
+            board[tree] = TREE
+            pairs[tree] = i
+        else:
+            board[i] = EMPTY
+
+    # Constraints (they must be single digits)
+    for y in range(1, h):
+        board[y * w] = NUMBER + sum(1 for x in range(1, w) if board[y * w + x] == TENT)
+    for x in range(1, w):
+        board[x] = NUMBER + sum(1 for y in range(1, h) if board[y * w + x] == TENT)
+    if any(board[i] > NUMBER + 9 for i in range(1, w)) or any(board[y * w] > NUMBER + 9 for y in range(1, h)):
+        return None
+
+    for i in pairs.values():
+        board[i] = EMPTY
+    return board, pairs
+
+
+def _move_trees(board: bytearray, w: int, h: int, pairs: dict[int, int], tents: set[int], wrong: list[int],
+                rng: random.Random) -> bool:
+    """
+    Moves the trees adjacent to the wrong cells (tents in another solution) to a free cell adjacent to
+    their own tent, preferring the cells that aren't adjacent to wrong cells.
+    Returns False if no tree could be moved.
+    """
+    near_wrong = {j for i in wrong for j in _adjacent(i, w, h)}
+    moved = False
+    for tree in [j for j in near_wrong if board[j] == TREE]:
+        tent = pairs[tree]
+        free = [j for j in _adjacent(tent, w, h) if board[j] == EMPTY and j not in tents]
+        if not free:
+            continue
+        better = [j for j in free if j not in near_wrong]
+        new_tree = rng.choice(better or free)
+        board[tree], board[new_tree] = EMPTY, TREE
+        pairs[new_tree] = pairs.pop(tree)
+        moved = True
+    return moved
+
+
+def generate_level(w: int, h: int, difficulty: str, seed: int) -> str | None:
+    """
+    Keeps generating levels until one with the passed difficulty is found.
+    Returns it as the text of a level file, or None if none was found in MAX_ATTEMPTS attempts
+    (i.e. big easy levels are rare). The same seed always gives the same level.
+    """
+    rng = random.Random(seed)
+    for _ in range(MAX_ATTEMPTS):
+        result = generate(w, h, rng)
+        if result is not None and rate(result[0], w + 1, h + 1)["label"] == difficulty:
+            return level_text(result[0], w + 1, h + 1)
+    return None
+
+
+def level_text(board: bytearray, w: int, h: int) -> str:
+    """
+    Returns the board in the format of the level files: the constraints as digits, "." for the empty cells
+    and "T" for the trees.
+    """
+    lines = []
+    for y in range(h):
+        line = ""
+        for x in range(w):
+            number = board[y * w + x]
+            if number == NULL:
+                line += "."
+            elif number >= NUMBER:
+                line += str(number - NUMBER)
+            else:
+                line += "T" if number == TREE else "."
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def _adjacent(i: int, w: int, h: int) -> list[int]:
+    """
+    Returns the indexes of the playable cells adjacent (not diagonal) to the cell at index i.
+    """
+    x, y = i % w, i // w
+    return [ny * w + nx for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)) if 1 <= nx < w and 1 <= ny < h]
+
+
+def _near(i: int, w: int, h: int) -> list[int]:
+    """
+    Returns the indexes of the playable cells near (diagonal is valid) the cell at index i.
+    """
+    x, y = i % w, i // w
+    return [ny * w + nx for ny in range(y - 1, y + 2) for nx in range(x - 1, x + 2)
+            if (nx, ny) != (x, y) and 1 <= nx < w and 1 <= ny < h]
@@ -0,0 +1,56 @@
+"""
+Line solver for the rows and columns of a Tents board.
+
+In a line (row or column) the tents can't touch each other, and their number is given by the constraint.
+For a line, solve_line() considers all the placements of the tents that are valid with the cells already
+fixed, and returns the empty cells that have the same state in all of them.
+
+A line is described by its length, its constraint and two bit masks (bit k is the k-th cell of the line):
+- tents: the cells that already contain a tent
+- blocked: the cells that can't contain a tent (trees and grass)
+The results are cached on these four numbers, so they are shared by all lines, levels and solver
+iterations with the same content.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1 << 16)
+def solve_line(length: int, target: int, tents: int, blocked: int) -> tuple[int, int] | None:
+    """
+    Returns two masks: the empty cells that are a tent in every valid placement, and the empty cells that
+    are a tent in none of them (so they must be grass).
+    Returns None if there's no valid placement (i.e. 3 -> gggg____: three tents in four cells always touch).
+    The placements aren't listed one by one (a line of 50 cells can have billions of them): the valid
+    prefixes and suffixes are computed as bit sets of tent counts (bit c: c tents), split by whether the
+    cell at the border is a tent. A cell can be a tent (or grass) if a prefix and a suffix agreeing with it
+    have target tents in total.
+    """
+    full = (1 << (target + 1)) - 1  # Counts from 0 to target
+
+    # prefixes[k]: the first k cells, as (last one not a tent, last one a tent)
+    # Bit c: the prefix can have c tents
+    prefixes = [(1, 0)]
+    free, tent = 1, 0
+    for k in range(length):
+        bit = 1 << k
+        free, tent = (0 if tents & bit else free | tent), (0 if blocked & bit else (free << 1) & full)
+        prefixes.append((free, tent))
+    if not (free | tent) >> target & 1:
+        return None
+
+    # Same for the suffixes (the cells from k to the end), going backward, but bit c here means that
+    # c tents are still needed before the suffix (target - the tents of the suffix)
+    can_tent, can_grass = 0, 0
+    free, tent = 1 << target, 0
+    for k in reversed(range(length)):
+        bit = 1 << k
+        before_free, before_tent = prefixes[k]
+        if not blocked & bit and before_free & (free >> 1):
+            can_tent |= bit
+        if not tents & bit and (before_free | before_tent) & (free | tent):
+            can_grass |= bit
+        free, tent = (0 if tents & bit else free | tent), (0 if blocked & bit else free >> 1)
+
+    empty = ((1 << length) - 1) & ~(tents | blocked)
+    return empty & ~can_grass, empty & ~can_tent
@@ -0,0 +1,70 @@
+"""
+Hopcroft-Karp maximum matching for bipartite graphs, in O(E * sqrt(V)).
+
+It's used to pair trees and tents: every tree must have its own adjacent tent and vice versa.
+"""
+
+from collections import deque
+
+
+def hopcroft_karp(adj: dict[int, list[int]], start: dict[int, int] = None) -> dict[int, int]:
+    """
+    Returns a maximum matching of the bipartite graph described by adj,
+    which maps every left vertex to the list of its right neighbours.
+    The matching is returned as a dictionary left vertex -> right vertex.
+    start is an optional matching to start from (i.e. the result on a similar graph): its pairs that
+    are still edges of adj are kept, so only the other vertices must be matched.
+    """
+    match_left = dict.fromkeys(adj)  # Left -> right (None if not matched)
+    match_right = {}                 # Right -> left
+    dist = {}
+
+    if start is not None:
+        for u, v in start.items():
+            if u in adj and v not in match_right and v in adj[u]:
+                match_left[u] = v
+                match_right[v] = u
+
+    def bfs() -> bool:
+        """
+        Builds the layers of the shortest alternating paths, starting from the free left vertices.
+        Returns True if at least one augmenting path exists.
+        """
+        queue = deque()
+        for u in adj:
+            if match_left[u] is None:
+                dist[u] = 0
+                queue.append(u)
+            else:
+                dist[u] = None
+        found = False
+        while queue:
+            u = queue.popleft()
+            for v in adj[u]:
+                w = match_right.get(v)
+                if w is None:
+                    found = True
+                elif dist[w] is None:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        return found
+
+    def dfs(u: int) -> bool:
+        """
+        Looks for an augmenting path from u following the layers, and flips it if found.
+        """
+        for v in adj[u]:
+            w = match_right.get(v)
+            if w is None or (dist[w] == dist[u] + 1 and dfs(w)):
+                match_left[u] = v
+                match_right[v] = u
+                return True
+        dist[u] = None  # Dead end, no need to visit it again in this phase
+        return False
+
+    while bfs():
+        for u in adj:
+            if match_left[u] is None:
+                dfs(u)
+
+    return {u: v for u, v in match_left.items() if v is not None}
@@ -0,0 +1,75 @@
+"""
+Difficulty rating of Tents levels.
+
+A level is solved with the automatic plays of TentsGame, like a player would do: after every play that makes
+some progress, the cheapest play is tried again. LADDER lists the plays from the cheapest one.
+When none of them makes progress, the rest of the level is left to the search of the solver.
+The score adds up the points of every play that was needed and of the search, and the label is given by the
+hardest technique needed (and by how many cells only the exclusion play could find).
+The exclusion play probes until nothing more can be found, so a single one solves almost every level that
+needs it: what tells the medium levels from the hard ones is how many cells it had to find by contradiction
+(compared to the size of the level, as bigger levels need more of them).
+"""
+
+from game import TentsGame
+from solver import Solver
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Automatic plays, from the cheapest: action, points for every time it makes progress, difficulty
+LADDER = (
+    ("AutoGrass", 1, "easy"),
+    ("AutoTent", 1, "easy"),
+    ("LinePlay", 2, "easy"),
+    ("ExclusionPlay", 5, "medium"),
+    ("CasesPlay", 15, "hard"),
+)
+SEARCH_POINTS = 25  # For every level of nested guesses needed by the search (which is always "hard")
+FOUND_POINTS = 1  # For every cell found by the exclusion plays
+HARD_FOUND = 0.04  # A level where the exclusion plays must find this fraction of the playable cells is "hard" too
+
+
+def rate(board: bytearray, w: int, h: int) -> dict:
+    """
+    Rates the level on the passed board (w * h cells, constraints included).
+    Returns a report with:
+    - score: the total points (higher is harder)
+    - label: one of DIFFICULTIES (None if the level can't be solved)
+    - passes: how many times each play of the ladder made progress
+    - found: cells found by the exclusion plays (see TentsGame.probe())
+    - nodes, depth: search nodes visited and maximum number of nested guesses (0 if no search was needed)
+    """
+    game = TentsGame(board=board, w=w, h=h)
+    passes = dict.fromkeys((action for action, _, _ in LADDER), 0)
+    score, label = 0, DIFFICULTIES[0]
+    found = 0
+
+    while not game.finished() and not game.wrong():
+        before = game.get_disconnected_board()
+        for action, points, difficulty in LADDER:
+            if action == "ExclusionPlay":
+                found += game.probe()["found"]  # The same play, with its report
+            else:
+                game.play(1, 1, action)  # Automatic plays don't need a position
+            if game.get_disconnected_board() != before:
+                passes[action] += 1
+                score += points
+                label = max(label, difficulty, key=DIFFICULTIES.index)
+                break
+        else:
+            break  # Stuck: the search is needed
+    score += FOUND_POINTS * found
+    if found >= HARD_FOUND * (w - 1) * (h - 1):
+        label = "hard"
+
+    nodes, depth = 0, 0
+    if not game.finished():
+        solver = Solver(game.get_disconnected_board(), w, h)
+        if solver.solve() is None:
+            label = None
+        else:
+            nodes, depth = solver.nodes, solver.depth
+            score += SEARCH_POINTS * max(depth, 1)
+            label = "hard"
+
+    return {"score": score, "label": label, "passes": passes, "found": found, "nodes": nodes, "depth": depth}
@@ -0,0 +1,361 @@
+"""
+Depth-first solver for the Tents puzzle.
+
+The solver works on a copy of the flat board used by TentsGame: same cell numbers, with the
+first row and the first column holding the column/row constraints (NUMBER + digit).
+It doesn't need any GUI module, so it can be used for batch checks of level files.
+"""
+
+from lines import solve_line
+from matching import hopcroft_karp
+
+# Cell numbers, shared with TentsGame. They all fit in a byte, so boards can be stored in a bytearray.
+EMPTY, TREE, TENT, GRASS = 0, 1, 2, 3
+CONNECTED_TREE, CONNECTED_TENT = 11, 12  # Tree/Tent + 10
+NUMBER = 90  # Constraints are stored as NUMBER + digit (i.e. 97 -> 7)
+NULL = 255   # Unused first cell
+
+# Translation table (for bytearray.translate) that disconnects all trees and tents
+DISCONNECT = bytes(c - 10 if c in (CONNECTED_TREE, CONNECTED_TENT) else c for c in range(256))
+
+# Reasons for which a cell has been fixed by the solver (indexes in RULES)
+NO_TREE, NEAR_TENT, LINE, LONELY_TREE, GUESS = range(5)
+RULES = ("NoTree", "NearTent", "Line", "LonelyTree", "Guess")
+
+
+class Contradiction(Exception):
+    """
+    Raised during propagation when the board reaches a state that can't lead to a solution.
+    """
+
+
+class Solver:
+    def __init__(self, board: bytearray, w: int, h: int):
+        """
+        Prepares the solver for the passed board (which is copied, not modified).
+        Connected trees and tents are treated as normal trees and tents.
+        A solver must be used for a single call of solve() or count_solutions().
+        """
+        self._w, self._h = w, h
+        self._cells = bytearray(board).translate(DISCONNECT)
+        self._row_target = [0] + [board[y * w] - NUMBER for y in range(1, h)]
+        self._col_target = [0] + [board[x] - NUMBER for x in range(1, w)]
+
+        # Neighbour tables: only cells inside the playable area (constraints excluded)
+        self._adj = [[] for _ in range(w * h)]   # Not diagonal
+        self._near = [[] for _ in range(w * h)]  # Diagonal included
+        self._rows = [[y * w + x for x in range(1, w)] for y in range(h)]
+        self._cols = [[y * w + x for y in range(1, h)] for x in range(w)]
+        for y in range(1, h):
+            for x in range(1, w):
+                i = y * w + x
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        nx, ny = x + dx, y + dy
+                        if (dx, dy) != (0, 0) and 1 <= nx < w and 1 <= ny < h:
+                            self._near[i].append(ny * w + nx)
+                            if dx == 0 or dy == 0:
+                                self._adj[i].append(ny * w + nx)
+
+        self._playable = [y * w + x for y in range(1, h) for x in range(1, w)]
+        self._trees = [i for i in self._playable if self._cells[i] == TREE]
+
+        self._row_tents, self._row_empty = [0] * h, [0] * h
+        self._col_tents, self._col_empty = [0] * w, [0] * w
+        # Line masks in the format of lines.solve_line() (bit x - 1 of a row, bit y - 1 of a column)
+        self._row_tent_mask, self._row_blocked = [0] * h, [0] * h
+        self._col_tent_mask, self._col_blocked = [0] * w, [0] * w
+        for i in self._playable:
+            x, y = i % w, i // w
+            if self._cells[i] == TENT:
+                self._row_tents[y] += 1
+                self._col_tents[x] += 1
+                self._row_tent_mask[y] |= 1 << (x - 1)
+                self._col_tent_mask[x] |= 1 << (y - 1)
+            elif self._cells[i] == EMPTY:
+                self._row_empty[y] += 1
+                self._col_empty[x] += 1
+            else:
+                self._row_blocked[y] |= 1 << (x - 1)
+                self._col_blocked[x] |= 1 << (y - 1)
+
+        self._trail = []  # Changed cells, used to undo the guesses
+        self._queue = []  # Changed cells whose surroundings must be checked again
+        self._dirty_rows, self._dirty_cols = set(), set()  # Lines with changed cells, checked once the queue is empty
+        self._reasons = bytearray(w * h)  # Rule that fixed each cell (the last time it was set)
+        self._empty = [i for i in self._playable if self._cells[i] == EMPTY]  # Cells to be fixed
+        self.nodes = 0    # Number of search nodes visited by the last solve
+        self.depth = 0    # Maximum number of nested guesses of the last solve
+        self._solutions, self._limit = 0, 1  # Solutions found so far, and how many are needed to stop
+        self.found = []  # First two solutions found by the last search (to compare them, if there's more than one)
+        self._tree_match, self._tent_match = {}, {}  # Last matchings found by _check_assignment()
+        self._max_nodes = None  # Search budget (None: no limit)
+        self.gave_up = False    # True if the last search ran out of budget (so its result is not a proof)
+
+    # -- PUBLIC METHODS --
+    def solve(self) -> bytearray | None:
+        """
+        Returns the solved board (in the same format as the board passed to the constructor).
+        Returns None if the puzzle has no solution: since the search is exhaustive, None is a proof
+        that no solution exists starting from the passed board.
+        """
+        self._run(1)
+        return self.found[0] if self.found else None
+
+    def count_solutions(self, limit: int = None, max_nodes: int = None) -> int:
+        """
+        Returns the number of solutions, stopping as soon as limit solutions have been found
+        (so the result is min(solutions, limit)). With no limit, all solutions are counted.
+        count_solutions(2) == 1 proves that the puzzle has a unique solution.
+        If max_nodes is passed, the search also stops after visiting that many nodes, setting gave_up:
+        in that case the result only counts the solutions found so far.
+        """
+        self._run(limit, max_nodes)
+        return self._solutions
+
+    def _run(self, limit: int | None, max_nodes: int = None):
+        """
+        Initial propagation followed by the search, stopping after limit solutions (None: never stop).
+        """
+        self.nodes, self.depth = 0, 0
+        self._solutions, self._limit = 0, limit
+        self.found = []
+        self._max_nodes, self.gave_up = max_nodes, False
+        try:
+            self._start()
+        except Contradiction:
+            return
+        self._search()
+
+    def fixed_cells(self) -> dict[str, int]:
+        """
+        After a successful solve, returns how many of the initially empty cells have been fixed by each rule.
+        Cells fixed while propagating a guess are counted under the rule that fixed them, not as guesses.
+        """
+        fixed = dict.fromkeys(RULES, 0)
+        for i in self._empty:
+            fixed[RULES[self._reasons[i]]] += 1
+        return fixed
+
+    # -- SEARCH --
+    def _search(self, depth: int = 0) -> bool:
+        """
+        Depth-first search: guesses on the most constrained cell and propagates after every guess.
+        depth is the number of guesses made to reach this node.
+        Returns True when the search must stop (enough solutions have been found).
+        """
+        self.nodes += 1
+        self.depth = max(self.depth, depth)
+        if self._max_nodes is not None and self.nodes > self._max_nodes:
+            self.gave_up = True
+            return True
+        if not self._check_assignment():
+            return False
+        i = self._choose()
+        if i is None:
+            self._solutions += 1
+            if len(self.found) < 2:
+                self.found.append(self._cells[:])
+            return self._solutions == self._limit
+
+        for state in (TENT, GRASS):
+            mark = len(self._trail)
+            try:
+                self._set(i, state, GUESS)
+                self._propagate()
+                if self._search(depth + 1):
+                    return True
+            except Contradiction:
+                self._queue.clear()
+                self._dirty_rows.clear()
+                self._dirty_cols.clear()
+            self._undo(mark)
+        return False
+
+    def _choose(self) -> int | None:
+        """
+        Returns the cell to guess on, or None if there are no empty cells.
+        The preferred cell is adjacent to the tree without tents that has fewer empty adjacent cells.
+        """
+        cells = self._cells
+        best, best_count = None, 5
+        for t in self._trees:
+            empties = []
+            for j in self._adj[t]:
+                if cells[j] == TENT:
+                    break
+                if cells[j] == EMPTY:
+                    empties.append(j)
+            else:
+                if len(empties) < best_count:
+                    best, best_count = empties[0], len(empties)
+                    if best_count == 2:
+                        break
+        if best is not None:
+            return best
+
+        for i in self._playable:
+            if cells[i] == EMPTY:
+                return i
+        return None
+
+    def _undo(self, mark: int):
+        """
+        Resets all the cells changed after the trail had length mark.
+        """
+        cells, w = self._cells, self._w
+        while len(self._trail) > mark:
+            i = self._trail.pop()
+            x, y = i % w, i // w
+            if cells[i] == TENT:
+                self._row_tents[y] -= 1
+                self._col_tents[x] -= 1
+                self._row_tent_mask[y] ^= 1 << (x - 1)
+                self._col_tent_mask[x] ^= 1 << (y - 1)
+            else:
+                self._row_blocked[y] ^= 1 << (x - 1)
+                self._col_blocked[x] ^= 1 << (y - 1)
+            cells[i] = EMPTY
+            self._row_empty[y] += 1
+            self._col_empty[x] += 1
+
+    # -- PROPAGATION --
+    def _set(self, i: int, state: int, rule: int):
+        """
+        Sets an empty cell to a tent or grass, keeping the counters and the trail updated.
+        rule is the reason why the cell has been fixed.
+        """
+        cells, w = self._cells, self._w
+        if cells[i] == state:
+            return
+        if cells[i] != EMPTY:
+            raise Contradiction
+        x, y = i % w, i // w
+        cells[i] = state
+        self._row_empty[y] -= 1
+        self._col_empty[x] -= 1
+        if state == TENT:
+            self._row_tents[y] += 1
+            self._col_tents[x] += 1
+            self._row_tent_mask[y] |= 1 << (x - 1)
+            self._col_tent_mask[x] |= 1 << (y - 1)
+        else:
+            self._row_blocked[y] |= 1 << (x - 1)
+            self._col_blocked[x] |= 1 << (y - 1)
+        self._reasons[i] = rule
+        self._trail.append(i)
+        self._queue.append(i)
+
+    def _start(self):
+        """
+        Initial propagation: cells without adjacent trees become grass, then every cell is checked.
+        """
+        cells = self._cells
+        for i in self._playable:
+            if cells[i] == TENT:
+                if not any(cells[j] == TREE for j in self._adj[i]):
+                    raise Contradiction
+            elif cells[i] == EMPTY and not any(cells[j] == TREE for j in self._adj[i]):
+                self._set(i, GRASS, NO_TREE)
+        self._queue.extend(self._playable)
+        self._propagate()
+
+    def _propagate(self):
+        """
+        Applies the deduction rules around every changed cell until nothing changes.
+        The rows and columns are checked only when there are no cells left in the queue, once for all
+        the changes they received.
+        Raises Contradiction if the board can't be solved.
+        """
+        cells, w = self._cells, self._w
+        queue, dirty_rows, dirty_cols = self._queue, self._dirty_rows, self._dirty_cols
+        while queue or dirty_rows or dirty_cols:
+            if not queue:
+                if dirty_rows:
+                    y = dirty_rows.pop()
+                    self._check_line(self._rows[y], self._row_tents[y], self._row_empty[y], self._row_target[y],
+                                     self._row_tent_mask[y], self._row_blocked[y])
+                else:
+                    x = dirty_cols.pop()
+                    self._check_line(self._cols[x], self._col_tents[x], self._col_empty[x], self._col_target[x],
+                                     self._col_tent_mask[x], self._col_blocked[x])
+                continue
+
+            i = queue.pop()
+            if cells[i] == TENT:
+                # No tents can be near a tent
+                for j in self._near[i]:
+                    if cells[j] == TENT:
+                        raise Contradiction
+                    if cells[j] == EMPTY:
+                        self._set(j, GRASS, NEAR_TENT)
+            dirty_rows.add(i // w)
+            dirty_cols.add(i % w)
+            for t in self._adj[i]:
+                if cells[t] == TREE:
+                    self._check_tree(t)
+
+    def _check_line(self, line: list[int], tents: int, empty: int, target: int, tent_mask: int, blocked: int):
+        """
+        Checks a row or a column against its constraint, filling the cells that are forced.
+        """
+        if tents > target or tents + empty < target:
+            raise Contradiction
+        if empty == 0:
+            return
+
+        cells = self._cells
+        if tents == target:
+            for i in line:
+                if cells[i] == EMPTY:
+                    self._set(i, GRASS, LINE)
+            return
+
+        # Every valid placement of the tents in the line is considered (see lines.py)
+        forced = solve_line(len(line), target, tent_mask, blocked)
+        if forced is None:
+            raise Contradiction
+        tent_cells, grass_cells = forced
+        if tent_cells or grass_cells:
+            for k, i in enumerate(line):
+                if tent_cells >> k & 1:
+                    self._set(i, TENT, LINE)
+                elif grass_cells >> k & 1:
+                    self._set(i, GRASS, LINE)
+
+    def _check_tree(self, t: int):
+        """
+        A tree without adjacent tents needs at least one adjacent empty cell.
+        If it has only one, that cell must be its tent.
+        """
+        cells = self._cells
+        empty = None
+        for j in self._adj[t]:
+            if cells[j] == TENT:
+                return
+            if cells[j] == EMPTY:
+                if empty is not None:
+                    return
+                empty = j
+        if empty is None:
+            raise Contradiction
+        self._set(empty, TENT, LONELY_TREE)
+
+    def _check_assignment(self) -> bool:
+        """
+        Checks that the trees and tents can still be paired (see matching.py):
+        - every tree can get its own adjacent cell that is a tent or is still empty
+        - every tent can get its own adjacent tree
+        If both matchings exist, a single matching covering both trees and tents also exists.
+        On a board without empty cells this means that every tree has its own tent (and vice versa).
+        This finds early the trees whose only empty cells are already needed by other trees.
+        The matchings are started from the ones of the last check, which are almost complete.
+        """
+        cells = self._cells
+        tree_adj = {t: [j for j in self._adj[t] if cells[j] == TENT or cells[j] == EMPTY] for t in self._trees}
+        self._tree_match = hopcroft_karp(tree_adj, self._tree_match)
+        if len(self._tree_match) < len(tree_adj):
+            return False
+        tent_adj = {i: [t for t in self._adj[i] if cells[t] == TREE] for i in self._playable if cells[i] == TENT}
+        self._tent_match = hopcroft_karp(tent_adj, self._tent_match)
+        return len(self._tent_match) == len(tent_adj)
@@ -0,0 +1,65 @@
+"""
+Opt-in statistics of a TentsGame: calls and time of the plays, of the checks and of the connection sweeps,
+plus the board copies made.
+
+They're recorded only after TentsGame.enable_stats(), which wraps the methods of that single game:
+the class is never changed, so games without stats run exactly the same code as before.
+"""
+
+import cProfile
+import json
+import time
+
+
+class GameStats:
+    def __init__(self, profile: bool = False):
+        """
+        If profile is True, every play is also run under cProfile (much slower), so that the
+        whole trace can be saved with dump_profile().
+        """
+        self.calls = {}       # Name -> number of calls
+        self.times = {}       # Name -> total time in seconds (nested calls included)
+        self.sweeps = 0       # Sweeps of the board made by get_connected_board()
+        self.copies = 0       # Board copies
+        self.copied_bytes = 0
+        self.profiler = cProfile.Profile() if profile else None
+
+    def record(self, name: str, elapsed: float):
+        """
+        Records a call that took elapsed seconds.
+        """
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+
+    def timed(self, name: str, function):
+        """
+        Returns a wrapper of function that records every call under name.
+        """
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "times": {name: round(elapsed, 6) for name, elapsed in self.times.items()},
+            "sweeps": self.sweeps,
+            "copies": self.copies,
+            "copied_bytes": self.copied_bytes,
+        }
+
+    def dump_json(self, filename: str):
+        with open(filename, "w") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    def dump_profile(self, filename: str):
+        """
+        Saves the cProfile trace of the plays (it can be read with pstats, snakeviz...).
+        """
+        if self.profiler is None:
+            raise ValueError("Stats were enabled without profile=True")
+        self.profiler.dump_stats(filename)
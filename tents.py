@@ -0,0 +1,222 @@
+"""
+Headless command line tools for Tents levels (no GUI modules are imported).
+
+Usage:
+    python -m tents solve levels/ [--jobs N]
+    python -m tents unique levels/ [--jobs N]
+    python -m tents rate levels/ [--jobs N]
+    python -m tents generate --size 16x16 --difficulty medium [--count N] [--jobs N] [--seed S]
+
+solve: solves every level file (or every .txt file in the passed directories) and prints a JSON line for each one,
+with the result, the time taken, the search nodes and the number of cells fixed by each deduction rule.
+unique: checks that every level has exactly one solution, printing a JSON line for each one.
+rate: rates the difficulty of every level (see rating.py), printing a JSON line for each one.
+generate: makes new levels with a unique solution and saves them in levels/tents-<date>-<WxH>-<difficulty>.txt
+(a number is added to the name when the file already exists), printing a JSON line for each one.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from game import TentsGame
+from generator import generate_level
+from rating import DIFFICULTIES, rate
+from solver import Solver
+
+
+def level_files(paths: list[str]) -> list[str]:
+    """
+    Returns the list of level files in the passed paths.
+    Directories are expanded to the .txt files they contain (sorted by name).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".txt"))
+        else:
+            files.append(path)
+    return files
+
+
+def solve_file(filename: str) -> dict:
+    """
+    Loads and solves a single level file. Returns the report of the level.
+    (Top level function, so that it can be sent to the worker processes)
+    """
+    start = time.perf_counter()
+    game = TentsGame(filename)
+    solver = Solver(game.get_disconnected_board(), game.cols(), game.rows())
+    solution = solver.solve()
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "file": filename,
+        "solved": solution is not None,
+        "time": round(elapsed, 6),
+        "nodes": solver.nodes,
+    }
+    if solution is not None:
+        report["fixed"] = solver.fixed_cells()
+    return report
+
+
+def unique_file(filename: str) -> dict:
+    """
+    Loads a single level file and counts its solutions (stopping at 2). Returns the report of the level.
+    """
+    start = time.perf_counter()
+    game = TentsGame(filename)
+    solutions = game.count_solutions(limit=2)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "file": filename,
+        "unique": solutions == 1,
+        "solutions": solutions,  # Counted up to 2
+        "time": round(elapsed, 6),
+    }
+
+
+def rate_file(filename: str) -> dict:
+    """
+    Loads a single level file and rates its difficulty. Returns the report of the level.
+    """
+    start = time.perf_counter()
+    game = TentsGame(filename)
+    rating = rate(game.get_disconnected_board(), game.cols(), game.rows())
+    elapsed = time.perf_counter() - start
+
+    return {"file": filename, "rated": rating["label"] is not None, **rating, "time": round(elapsed, 6)}
+
+
+def solve_command(args: argparse.Namespace) -> int:
+    return _run_files(solve_file, args, "solved")
+
+
+def unique_command(args: argparse.Namespace) -> int:
+    return _run_files(unique_file, args, "unique")
+
+
+def rate_command(args: argparse.Namespace) -> int:
+    return _run_files(rate_file, args, "rated")
+
+
+def generate_command(args: argparse.Namespace) -> int:
+    """
+    Generates the levels in parallel (each one with its own seed, so the results don't depend on the
+    number of jobs) and saves them as soon as they're ready.
+    """
+    w, h = args.size
+    base_seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    seeds = range(base_seed, base_seed + args.count)
+    stem = f"tents-{datetime.date.today().isoformat()}-{w}x{h}-{args.difficulty}"
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = (repeat(w), repeat(h), repeat(args.difficulty), seeds)
+    if args.jobs == 1:
+        levels = map(generate_level, *jobs)
+        return _save_levels(levels, seeds, args.output, stem)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        levels = executor.map(generate_level, *jobs, chunksize=max(1, args.count // (args.jobs * 8)))
+        return _save_levels(levels, seeds, args.output, stem)
+
+
+def _save_levels(levels, seeds, directory: str, stem: str) -> int:
+    """
+    Saves every level in a new file (existing files are never overwritten) and prints a JSON line for each one.
+    Returns the exit code: 1 if some levels couldn't be generated.
+    """
+    number, all_ok = 1, True
+    for text, seed in zip(levels, seeds):
+        if text is None:
+            all_ok = False
+            print(json.dumps({"file": None, "seed": seed}), flush=True)
+            continue
+        while True:
+            path = os.path.join(directory, f"{stem}.txt" if number == 1 else f"{stem}-{number}.txt")
+            number += 1
+            if not os.path.exists(path):
+                break
+        with open(path, "w") as file:
+            file.write(text)
+        print(json.dumps({"file": path, "seed": seed}), flush=True)
+    return 0 if all_ok else 1
+
+
+def _size(text: str) -> tuple[int, int]:
+    """
+    Parses a board size written as WxH (playable cells, constraints excluded).
+    """
+    try:
+        w, h = map(int, text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text} (expected WxH, i.e. 16x16)")
+    if w < 2 or h < 2:
+        raise argparse.ArgumentTypeError(f"invalid size: {text} (at least 2x2)")
+    return w, h
+
+
+def _run_files(function, args: argparse.Namespace, key: str) -> int:
+    """
+    Runs function on every level file (in parallel if more than one job is requested) and prints the reports.
+    """
+    files = level_files(args.paths)
+    if args.jobs == 1:
+        return _print_reports(map(function, files), key)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        return _print_reports(executor.map(function, files), key)
+
+
+def _print_reports(reports, key: str) -> int:
+    """
+    Prints a JSON line for each report, as soon as it's ready (in the same order as the files).
+    Returns the exit code: 0 if key is true in all the reports, 1 otherwise.
+    """
+    all_ok = True
+    for report in reports:
+        all_ok &= report[key]
+        print(json.dumps(report, ensure_ascii=False), flush=True)
+    return 0 if all_ok else 1
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="tents", description="Headless tools for Tents levels.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve = commands.add_parser("solve", help="solve level files and print a JSON line for each one")
+    solve.add_argument("paths", nargs="+", help="level files or directories of level files")
+    solve.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="number of worker processes")
+    solve.set_defaults(run=solve_command)
+
+    unique = commands.add_parser("unique", help="check that level files have exactly one solution")
+    unique.add_argument("paths", nargs="+", help="level files or directories of level files")
+    unique.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="number of worker processes")
+    unique.set_defaults(run=unique_command)
+
+    rate_parser = commands.add_parser("rate", help="rate the difficulty of level files")
+    rate_parser.add_argument("paths", nargs="+", help="level files or directories of level files")
+    rate_parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="number of worker processes")
+    rate_parser.set_defaults(run=rate_command)
+
+    generate = commands.add_parser("generate", help="generate new levels with a unique solution")
+    generate.add_argument("--size", type=_size, required=True, help="playable cells, as WxH (i.e. 16x16)")
+    generate.add_argument("--difficulty", choices=DIFFICULTIES, default="medium", help="difficulty of the levels")
+    generate.add_argument("--count", type=int, default=1, help="number of levels to generate")
+    generate.add_argument("--output", default="levels", help="directory where the levels are saved")
+    generate.add_argument("--seed", type=int, help="seed of the first level (the others use the next numbers)")
+    generate.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="number of worker processes")
+    generate.set_defaults(run=generate_command)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
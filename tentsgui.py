@@ -0,0 +1,57 @@
+"""
+GUI of TentsGame: the same as BoardGameGui, but the slow automatic plays run in background (see background.py),
+so that the window keeps responding while they run.
+"""
+
+import g2d
+from background import BackgroundPlay
+from boardgamegui import BoardGameGui
+from game import TentsGame
+
+BACKGROUND_ACTIONS = ("ExclusionPlay", "CasesPlay")
+CANCEL_KEY = "x"
+
+
+class TentsGui(BoardGameGui):
+    def __init__(self, game: TentsGame, actions: dict, annots: dict):
+        """
+        The keys of BACKGROUND_ACTIONS start a background play instead of playing on the game directly.
+        While it runs, the status row shows its progress and the other keys are ignored, except for
+        CANCEL_KEY (which stops it) and Escape (which stops it and closes the window).
+        """
+        self._background = {key: action for key, action in actions.items() if action in BACKGROUND_ACTIONS}
+        self._worker = None
+        super().__init__(game, {key: action for key, action in actions.items() if key not in self._background}, annots)
+
+    def tick(self):
+        worker = self._worker
+        released = set(g2d.previous_keys()) - set(g2d.current_keys())
+        if worker is None:
+            for key, action in self._background.items():
+                if key in released:
+                    self._worker = BackgroundPlay(self._game, action, g2d.request_redraw)
+                    self.update_buttons()
+                    return
+            super().tick()
+            return
+
+        if "Escape" in released:
+            worker.cancel()
+            g2d.close_canvas()
+            return
+        if CANCEL_KEY in released:
+            worker.cancel()
+        if worker.finished():
+            # The whole result is applied between two frames, so a half played board is never drawn
+            self._worker = None
+            worker.apply(self._game)
+            g2d.request_redraw()  # The next tick checks if the result finished the game
+        self.update_buttons()
+
+    def status(self) -> str:
+        worker = self._worker
+        if worker is None:
+            return super().status()
+        if worker.cancelled():
+            return f"{worker.action}: cancelling..."
+        return f"{worker.action}: {worker.done}/{worker.total} ({CANCEL_KEY}: cancel)"
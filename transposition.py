@@ -0,0 +1,92 @@
+"""
+Transposition table of the cases tried by the automatic plays of TentsGame.
+
+ExclusionPlay and CasesPlay try a cell as a tent or as grass and propagate the consequences with other plays:
+many of these hypothetical boards end up being the same board (and pressing the same key twice tries the same
+cases again). The table maps a board, plus the plays made on it, to their result, so each of them is derived once.
+
+The boards are identified by their Zobrist hash: a random 64-bit key for every cell and state, XORed together
+for the whole board. Changing a cell only needs two XORs, so TentsGame keeps the hash of its board updated at
+every change. Two different boards could have the same hash, but with 64 bits it's very unlikely
+(the boards aren't compared, as keeping a copy of each of them would use much more memory).
+"""
+
+import random
+from collections import OrderedDict
+from functools import lru_cache
+
+from solver import EMPTY, TREE, TENT, GRASS, CONNECTED_TREE, CONNECTED_TENT
+
+MAX_ENTRIES = 1 << 12  # Default size of a table
+
+# States that a cell can change to/from (constraints never change, so they have no key)
+ZOBRIST_STATES = (EMPTY, TREE, TENT, GRASS, CONNECTED_TREE, CONNECTED_TENT)
+SLOTS = bytearray(256)  # Number -> index of its keys in zobrist_keys()
+for _slot, _number in enumerate(ZOBRIST_STATES):
+    SLOTS[_number] = _slot
+
+
+@lru_cache(maxsize=16)
+def zobrist_keys(cells: int) -> tuple[list[int], ...]:
+    """
+    Returns the keys for a board of the passed number of cells, as a list of keys (one for every cell) for each
+    of ZOBRIST_STATES. The keys of EMPTY are 0, so the hash of a board only depends on its filled cells.
+    The keys are the same for all the boards of the same size (the random generator is seeded with it).
+    """
+    rng = random.Random(cells)
+    return tuple([0] * cells if number == EMPTY else [rng.getrandbits(64) for _ in range(cells)]
+                 for number in ZOBRIST_STATES)
+
+
+def zobrist_hash(board: bytearray) -> int:
+    """
+    Returns the hash of the whole board (then it can be updated one cell at a time).
+    """
+    keys = zobrist_keys(len(board))
+    result = 0
+    for i, number in enumerate(board):
+        result ^= keys[SLOTS[number]][i]
+    return result
+
+
+class TranspositionTable:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        """
+        Keeps at most max_entries results: when it's full, the least recently used one is dropped.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns the result stored for key, or None.
+        """
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_dict(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
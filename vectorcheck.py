@@ -0,0 +1,151 @@
+"""
+Vectorized versions of TentsGame.finished() and TentsGame.wrong(), made with NumPy.
+
+Every local check is computed at once on whole arrays with shifted boolean masks, instead of looping on
+the cells. The checks that aren't local (the pairing of trees and tents, the placements of the tents in a line) are then
+made one board at a time, only on the boards that the other checks haven't already decided. The functions accept a single board with shape (h, w) or a stack of boards with shape
+(n, h, w), so thousands of candidate boards of the same level can be validated with a single call.
+The boards use the same numbers as TentsGame (constraints included in the first row and column).
+
+NumPy is an optional dependency: only this module needs it.
+"""
+
+import numpy as np
+
+from lines import solve_line
+from matching import hopcroft_karp
+from solver import EMPTY, TREE, TENT, CONNECTED_TREE, CONNECTED_TENT, NUMBER
+
+
+def board_array(board: bytearray, w: int, h: int) -> np.ndarray:
+    """
+    Returns a (h, w) array that shares its memory with the passed board (no copies are made).
+    """
+    return np.frombuffer(board, dtype=np.uint8).reshape(h, w)
+
+
+def _shift(mask: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """
+    Returns the mask moved by (dx, dy) on the last two axes: cell (x, y) of the result is cell
+    (x - dx, y - dy) of the mask. Cells coming from outside the board are False.
+    """
+    result = np.zeros_like(mask)
+    h, w = mask.shape[-2:]
+    result[..., max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+        mask[..., max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+    return result
+
+
+def _any_adjacent(mask: np.ndarray) -> np.ndarray:
+    """
+    For every cell, True if at least one adjacent (not diagonal) cell is True in the mask.
+    """
+    return _shift(mask, -1, 0) | _shift(mask, 1, 0) | _shift(mask, 0, -1) | _shift(mask, 0, 1)
+
+
+def _any_near(mask: np.ndarray) -> np.ndarray:
+    """
+    For every cell, True if at least one near (diagonal is valid) cell is True in the mask.
+    """
+    result = _any_adjacent(mask)
+    for dx, dy in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+        result |= _shift(mask, dx, dy)
+    return result
+
+
+def _split(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Splits the boards in playable cells, row constraints and column constraints.
+    """
+    boards = np.asarray(boards, dtype=np.uint8)
+    cells = boards[..., 1:, 1:]
+    rows = boards[..., 1:, 0].astype(np.int16) - NUMBER
+    cols = boards[..., 0, 1:].astype(np.int16) - NUMBER
+    return cells, rows, cols
+
+
+def _each(boards: np.ndarray, result: np.ndarray, check) -> np.ndarray:
+    """
+    Calls check on every (h, w) board where result is True, and sets result to its outcome.
+    Returns the result (a single value if a single board was passed).
+    """
+    flat_boards = boards.reshape((-1,) + boards.shape[-2:])
+    flat_result = result.reshape(-1).copy()
+    for k in np.flatnonzero(flat_result):
+        flat_result[k] = check(flat_boards[k])
+    return flat_result.reshape(result.shape)
+
+
+def _matched(board: np.ndarray) -> bool:
+    """
+    Same as TentsGame._check_matching() on a single (h, w) board that has as many trees as tents.
+    """
+    cells = board[1:, 1:]
+    tents = (cells == TENT) | (cells == CONNECTED_TENT)
+    adj = {}
+    for y, x in zip(*np.nonzero((cells == TREE) | (cells == CONNECTED_TREE))):
+        adj[y, x] = [(ny, nx) for ny, nx in ((y, x - 1), (y, x + 1), (y - 1, x), (y + 1, x))
+                     if 0 <= ny < cells.shape[0] and 0 <= nx < cells.shape[1] and tents[ny, nx]]
+    return len(hopcroft_karp(adj)) == len(adj)
+
+
+def _lines_possible(board: np.ndarray) -> bool:
+    """
+    Same as TentsGame._check_lines() on a single (h, w) board.
+    """
+    cells, rows, cols = _split(board)
+    tents = (cells == TENT) | (cells == CONNECTED_TENT)
+    blocked = ~tents & (cells != EMPTY)
+    for line_tents, line_blocked, targets in ((tents, blocked, rows), (tents.T, blocked.T, cols)):
+        for k, target in enumerate(targets):
+            tent_mask = sum(1 << j for j in np.flatnonzero(line_tents[k]))
+            blocked_mask = sum(1 << j for j in np.flatnonzero(line_blocked[k]))
+            if solve_line(len(line_tents[k]), int(target), tent_mask, blocked_mask) is None:
+                return False
+    return True
+
+
+def finished(boards: np.ndarray) -> np.ndarray:
+    """
+    Same result as TentsGame.finished() for every board. The pairing of trees and tents
+    (TentsGame._check_matching) is only looked for on the boards that pass all the other checks.
+    """
+    boards = np.asarray(boards, dtype=np.uint8)
+    cells, rows, cols = _split(boards)
+    trees = (cells == TREE) | (cells == CONNECTED_TREE)
+    tents = (cells == TENT) | (cells == CONNECTED_TENT)
+    axes = (-2, -1)
+
+    local = (
+        (trees.sum(axis=axes) == tents.sum(axis=axes))          # _check_equity
+        & ~(trees & ~_any_adjacent(tents)).any(axis=axes)      # _check_all_trees
+        & ~(tents & ~_any_adjacent(trees)).any(axis=axes)      # _check_all_tents_adj_trees
+        & ~(tents & _any_near(tents)).any(axis=axes)           # _check_all_tents_vicinity
+        & (tents.sum(axis=-1) == rows).all(axis=-1)            # _check_row_constraints
+        & (tents.sum(axis=-2) == cols).all(axis=-1)            # _check_col_constraints
+    )
+    return _each(boards, np.asarray(local), _matched)            # _check_matching
+
+
+def wrong(boards: np.ndarray) -> np.ndarray:
+    """
+    Same result as TentsGame.wrong() for every board. The placements of the tents in every line
+    (TentsGame._check_lines) are only looked for on the boards that the other checks don't find wrong.
+    """
+    boards = np.asarray(boards, dtype=np.uint8)
+    cells, rows, cols = _split(boards)
+    tents = (cells == TENT) | (cells == CONNECTED_TENT)
+    empty = cells == EMPTY
+    row_tents, col_tents = tents.sum(axis=-1), tents.sum(axis=-2)
+    row_complete, col_complete = ~empty.any(axis=-1), ~empty.any(axis=-2)
+    axes = (-2, -1)
+
+    right = (
+        ~(row_complete & (row_tents != rows)).any(axis=-1)                          # _check_complete_rows
+        & ~(col_complete & (col_tents != cols)).any(axis=-1)                        # _check_complete_cols
+        & ~(tents & _any_near(tents)).any(axis=axes)                                # _check_all_tents_vicinity
+        & (row_tents <= rows).all(axis=-1) & (col_tents <= cols).all(axis=-1)       # _check_tents_below_constraint
+        & ~((cells == TREE) & ~_any_adjacent(cells == TENT) & ~_any_adjacent(empty)).any(axis=axes)  # _check_wrong_tree
+        & ~((cells == TENT) & ~_any_adjacent(cells == TREE)).any(axis=axes)         # _check_wrong_tent
+    )
+    return ~_each(boards, np.asarray(right), _lines_possible)                      # _check_lines